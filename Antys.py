@@ -1,117 +1,226 @@
-import requests
-import json
 import sys
+import os
 import re
-from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QTextBrowser, QFileDialog, QScrollArea, QCheckBox, QMessageBox, QHBoxLayout, QTextEdit, QTabWidget, QMenu
-from PySide6.QtCore import QThread, Signal, Qt
+import logging
+from PySide6.QtWidgets import QApplication, QWidget, QVBoxLayout, QLabel, QLineEdit, QPushButton, QFileDialog, QCheckBox, QMessageBox, QHBoxLayout, QTextEdit, QTabWidget, QMenu, QSpinBox, QDoubleSpinBox, QListView, QStyledItemDelegate, QStyle, QDateEdit
+from PySide6.QtCore import QObject, QThread, QTimer, Signal, Qt, QAbstractListModel, QModelIndex, QEvent, QUrl, QSortFilterProxyModel, QDate, QRectF, QPoint
 from functools import partial
-from PySide6.QtGui import QAction, QIcon
+from PySide6.QtGui import QAction, QIcon, QDesktopServices, QPainter, QColor
+from chat_records import format_timestamp, video_time_url, vod_tab_title
+from chat_store import ChatStore
+from chat_archive import ChatArchive
+from chat_async import AsyncFetchEngine
+from chat_crawler import ChatCrawler, load_channel_vods, search_stored
+from chat_query import QuerySet
+from chat_metrics import format_eta, setup_logging
+from chat_watch import PREFETCH_COUNT, ChannelWatcher
+from chat_timeline import TIMELINE_BIN_MS, chat_histogram, spike_links, vod_timeline
+from chat_export import EXPORT_FILE_FILTER, EXPORT_FILE_FILTERS, export_chats, guess_format, vod_meta
+from chzzk_api import ChzzkApiError, ChzzkClient, RateLimiter, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, parse_channel_id
+
+log = logging.getLogger("antys")
+
+# 탭에 띄워둔 채팅 목록이 다 합쳐서 이만큼 (ANTYS_TAB_MEMORY_MB) 을 넘으면 오래 안 본 탭부터 비워요
+TAB_MEMORY_BUDGET_MB = 256
+# ChatRecord 하나가 목록에서 차지하는 대략적인 크기 (짧은 채팅 기준으로 재본 값)
+CHAT_RECORD_BYTES = 300
+
 
 class ChatFetcherThread(QThread):
     chat_fetched = Signal(list, str, object)
-    chat_progress = Signal(str)
-    
+    chat_progress = Signal(list, object)
+    fetch_progress = Signal(object, float, float)
 
-    def __init__(self, video_id, nickname_filter, message_filter):
+    def __init__(self, video_id, query, store=None, client=None, duration_ms=0, archive=None):
         super().__init__()
         self.video_id = video_id
-        self.seen_messages = set()
-        self.nickname_filter = nickname_filter
-        self.message_filter = message_filter
-        self.thread_queue = []
-        self.current_thread_index = 0
+        self.crawler = ChatCrawler(
+            video_id, query, store, client, duration_ms,
+            on_chats=lambda chats: self.chat_progress.emit(chats, self.video_id),
+            on_progress=lambda fraction, eta: self.fetch_progress.emit(
+                self.video_id, fraction, -1.0 if eta is None else eta,
+            ),
+            archive=archive,
+        )
+
+    def stop(self):
+        self.crawler.stop()
+
+    def run(self):
+        filtered_chats, error_message = self.crawler.run()
+        self.chat_fetched.emit(filtered_chats, error_message, self.video_id)
+
+
+class AsyncFetchBridge(QObject):
+    """AsyncFetchEngine 과 GUI 를 잇는 다리
+
+    엔진이 모아 보낸 이벤트 목록을 시그널 한 번으로 GUI 스레드에 넘겨요.
+    다시보기가 몇십 개여도 스레드는 엔진 하나뿐이고, 화면은 CHAT_BATCH_INTERVAL 마다 한 번만 깨워요.
+    """
+    events_ready = Signal(list)
+
+    def __init__(self, client, store, archive=None):
+        super().__init__()
+        self.engine = AsyncFetchEngine(client, store, on_events=self.events_ready.emit, archive=archive)
+
+    def is_running(self, video_id):
+        return self.engine.is_running(video_id)
+
+    def submit(self, video_id, query, duration_ms=0):
+        return self.engine.submit(video_id, query, duration_ms)
+
+    def stop(self):
+        self.engine.stop()
+
+
+class LocalSearchThread(QThread):
+    """다 받아둔 모든 다시보기에서 색인으로 한 번에 찾아서 다시보기별로 넘겨줘요"""
+    vod_found = Signal(str, object, list)
+    search_finished = Signal(int, int)
+
+    def __init__(self, store, query):
+        super().__init__()
+        self.store = store
+        self.query = query
         self._is_running = True
 
     def stop(self):
         self._is_running = False
 
     def run(self):
-        API_URL = f"https://api.chzzk.naver.com/service/v1/videos/{self.video_id}/chats"
-        headers = {
-            "Accept": "application/json",
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36 Edg/134.0.0.0",
-            "Referer": f"https://chzzk.naver.com/video/{self.video_id}"
-        }
-
-        current_time = 0
-        filtered_chats = []
-
-        print("채팅 수집 시작!")
-
-        while self._is_running:
-            print(f"[요청] playerMessageTime={current_time}")
-            params = {"playerMessageTime": str(current_time)}
-            response = requests.get(API_URL, headers=headers, params=params)
-
-            if response.status_code != 200:
-                print(f"!!! HTTP 상태 코드: {response.status_code} !!!")
-                self.chat_fetched.emit([], f"!!! 요청 실패! HTTP 상태 코드: {response.status_code} !!!", self.video_id)
-                return
-
-            chat_data = response.json()
-            video_chats = chat_data.get("content", {}).get("videoChats", [])
-            print(f"[응답] 채팅 수: {len(video_chats)}")
-
-            if not video_chats:
-                print("[완료] 더 이상 가져올 채팅이 없네요! 수집을 종료할께요!")
-                break
+        vod_count = 0
+        chat_count = 0
+
+        for meta, chats in search_stored(self.store, self.query, lambda: self._is_running):
+            self.vod_found.emit(str(meta["video_no"]), meta, chats)
+            vod_count += 1
+            chat_count += len(chats)
+
+        if self._is_running:
+            self.search_finished.emit(vod_count, chat_count)
+
 
-            for chat in video_chats:
-                if not self._is_running:
-                    break
+class VodListThread(QThread):
+    """채널 다시보기 목록을 GUI 를 멈추지 않고 뒤에서 받아서, 받는 대로 조금씩 넘겨줘요"""
+    vods_found = Signal(list)
+    list_finished = Signal(int, str)
 
-                profile_str = chat.get("profile")
-                message_time = chat.get("playerMessageTime", 0)
+    def __init__(self, client, store, channel_id):
+        super().__init__()
+        self.client = client
+        self.store = store
+        self.channel_id = channel_id
+        self._is_running = True
+
+    def stop(self):
+        self._is_running = False
+
+    def run(self):
+        try:
+            vods = load_channel_vods(
+                self.client, self.store, self.channel_id,
+                on_vods=self.vods_found.emit, cancelled=lambda: not self._is_running,
+            )
+        except ChzzkApiError as e:
+            self.list_finished.emit(-1, str(e.status_code or e))
+            return
+        except Exception as e:
+            # 응답이 깨졌을 때도 알려줘야 불러오기 버튼이 다시 켜져요
+            log.exception("다시보기 목록을 못 받았어요")
+            self.list_finished.emit(-1, repr(e))
+            return
 
-                profile_data = {}
-                if profile_str:
-                    try:
-                        loaded = json.loads(profile_str)
-                        if isinstance(loaded, dict):
-                            profile_data = loaded
-                        else:
-                            print(f"!!! [무시됨] profile_str가 dict가 아님: {profile_str} !!!")
-                    except json.JSONDecodeError:
-                        print(f"!!! [파싱 실패] profile_str: {profile_str} !!!")
+        if self._is_running:
+            self.list_finished.emit(len(vods), "")
 
-                chat_nickname = profile_data.get("nickname", "Unknown")
-                message = chat.get("content", "")
 
-                nickname_match = not self.nickname_filter or chat_nickname == self.nickname_filter
-                message_match = not self.message_filter or self.message_filter in message
+class WatchThread(QThread):
+    """지켜보는 채널의 새 다시보기를 뒤에서 받아두고, 저장한 조건에 맞는 채팅을 찾으면 알려줘요"""
+    vod_matched = Signal(str, object, list)
+
+    def __init__(self, store, is_busy=None, archive=None):
+        super().__init__()
+        self.watcher = ChannelWatcher(store, on_matches=self.vod_matched.emit, is_busy=is_busy, archive=archive)
+
+    def stop(self):
+        self.watcher.stop()
+
+    def run(self):
+        self.watcher.run()
 
-                if nickname_match and message_match and message_time not in self.seen_messages:
-                    formatted_chat = f'{self.format_time(message_time)} - {chat_nickname}: {message}'
-                    filtered_chats.append(formatted_chat)
-                    self.seen_messages.add(message_time)
-                    print(f"[채팅] {formatted_chat}")
-                    self.chat_progress.emit(formatted_chat)
 
-            current_time = video_chats[-1]["playerMessageTime"] + 1
+class PrefetchThread(QThread):
+    """방금 불러온 목록의 최신 다시보기를 가장 낮은 우선순위로 미리 받아둬요. 사람이 누른 수집이 돌면 바로 비켜줘요
 
-        print(f"[결과] 총 수집된 채팅 수는... {len(filtered_chats)}")
-        self.chat_fetched.emit(filtered_chats, None, self.video_id)
+    지켜보는 채널이면 지켜보기 대신 먼저 받은 다시보기도 저장한 조건으로 찾아서 알려줘요.
+    """
+    vod_matched = Signal(str, object, list)
 
+    def __init__(self, store, vods, channel_id=None, is_busy=None, archive=None):
+        super().__init__()
+        self.vods = vods
+        self.channel_id = channel_id
+        self.watcher = ChannelWatcher(store, on_matches=self.vod_matched.emit, is_busy=is_busy, archive=archive)
 
+    def stop(self):
+        self.watcher.stop()
 
+    def run(self):
+        count = self.watcher.ingest_vods(self.vods, self.channel_id)
+        log.info("[미리 받기] 최신 다시보기 %d개 중 %d개를 새로 받아뒀어요", len(self.vods), count)
 
-    def format_time(self, milliseconds):
-        """밀리초를 hh:mm:ss 형식으로 변환하고 링크로 감싸 반환"""
-        total_seconds = milliseconds // 1000
-        hours = total_seconds // 3600
-        minutes = (total_seconds % 3600) // 60
-        seconds = total_seconds % 60
-        time_str = f"{hours:02}:{minutes:02}:{seconds:02}"
-        video_url = f"https://chzzk.naver.com/video/{self.video_id}?currentTime={total_seconds}"
-        return f'<a href="{video_url}">{time_str}</a>'
+
+class TimelineThread(QThread):
+    """저장된 채팅 전체와 찾은 채팅의 분당 채팅 수, 채팅이 몰린 구간을 뒤에서 계산해요"""
+    timeline_ready = Signal(object, object, list)
+
+    def __init__(self, store, video_id, matched_times, duration_ms=None):
+        super().__init__()
+        self.store = store
+        self.video_id = video_id
+        self.matched_times = matched_times
+        self.duration_ms = duration_ms
+        self._is_running = True
+
+    def stop(self):
+        self._is_running = False
+
+    def run(self):
+        timeline = vod_timeline(self.store, self.video_id, self.duration_ms, cancelled=lambda: not self._is_running)
+        if not self._is_running:
+            return
+        if timeline is None:
+            overall, spikes = None, []
+            length = self.duration_ms
+        else:
+            overall, spikes = timeline
+            length = len(overall) * TIMELINE_BIN_MS
+
+        matched = chat_histogram(self.matched_times, length) if self.matched_times else None
+        if self._is_running:
+            self.timeline_ready.emit(overall, matched, spike_links(self.video_id, spikes))
 
 
 class ChatFetcherApp(QWidget):
     def __init__(self):
         super().__init__()
 
-        self.vod_checkboxes = []
-        self.vod_data_list = []
+        self.vod_model = VodListModel()
+        self.chat_store = ChatStore()
+        self.rate_limiter = RateLimiter()
+        self.chzzk_client = ChzzkClient(self.rate_limiter)
+        # ANTYS_ARCHIVE_DIR 를 주면 받은 응답을 거르기 전에 그대로 압축해서 보관해요
+        archive_dir = os.environ.get("ANTYS_ARCHIVE_DIR")
+        self.chat_archive = ChatArchive(archive_dir) if archive_dir else None
+        self.async_bridge = AsyncFetchBridge(self.chzzk_client, self.chat_store, self.chat_archive)
+        self.async_bridge.events_ready.connect(self.handle_async_events)
+        self.live_tabs = {}
+        self.recent_tabs = []  # 오래 안 본 탭부터
+        self.tab_memory_budget = int(os.environ.get("ANTYS_TAB_MEMORY_MB", TAB_MEMORY_BUDGET_MB)) * 1024 * 1024
+        self.found_chat_count = 0
+        self.thread_queue = []
+        self.current_thread_index = 0
+        self.running_thread_count = 0
 
         self.setWindowIcon(QIcon("Antys.ico"))
         self.setWindowTitle("Antys")
@@ -135,19 +244,40 @@ class ChatFetcherApp(QWidget):
         self.select_all_button.clicked.connect(self.toggle_all_checkboxes)
         left_layout.addWidget(self.select_all_button)
 
-        self.vod_scroll_area = QScrollArea()
-        self.vod_list_widget = QWidget()
-        self.vod_list_layout = QVBoxLayout()
-        self.vod_list_widget.setLayout(self.vod_list_layout)
-        self.vod_scroll_area.setWidget(self.vod_list_widget)
-        self.vod_scroll_area.setWidgetResizable(True)
-        left_layout.addWidget(self.vod_scroll_area, stretch=1)
+        self.vod_title_filter = QLineEdit()
+        self.vod_title_filter.setPlaceholderText("제목으로 거르기")
+        left_layout.addWidget(self.vod_title_filter)
+
+        vod_date_layout = QHBoxLayout()
+        self.vod_date_from = QDateEdit()
+        self.vod_date_to = QDateEdit()
+        for date_edit, special_text in ((self.vod_date_from, "처음부터"), (self.vod_date_to, "지금까지")):
+            # 가장 이른 날짜로 두면 날짜로는 안 걸러요
+            date_edit.setCalendarPopup(True)
+            date_edit.setDisplayFormat("yyyy-MM-dd")
+            date_edit.setMinimumDate(VodFilterProxyModel.NO_DATE)
+            date_edit.setSpecialValueText(special_text)
+            date_edit.setDate(VodFilterProxyModel.NO_DATE)
+            vod_date_layout.addWidget(date_edit)
+        left_layout.addLayout(vod_date_layout)
+
+        self.vod_proxy_model = VodFilterProxyModel()
+        self.vod_proxy_model.setSourceModel(self.vod_model)
+        self.vod_title_filter.textChanged.connect(self.update_vod_filter)
+        self.vod_date_from.dateChanged.connect(self.update_vod_filter)
+        self.vod_date_to.dateChanged.connect(self.update_vod_filter)
+
+        # 다시보기가 몇천 개여도 체크박스 위젯을 만들지 않고 보이는 줄만 그려요
+        self.vod_list_view = QListView()
+        self.vod_list_view.setUniformItemSizes(True)
+        self.vod_list_view.setModel(self.vod_proxy_model)
+        left_layout.addWidget(self.vod_list_view, stretch=1)
 
         self.nickname_label = QLabel("닉네임을 입력해주세요!")
         left_layout.addWidget(self.nickname_label)
 
         self.nickname_input = QLineEdit()
-        self.nickname_input.setPlaceholderText("요기만 입력하시면 입력한 닉네임의 모든 채팅 내역이 불러와져요!")
+        self.nickname_input.setPlaceholderText("요기만 입력하시면 입력한 닉네임의 모든 채팅 내역이 불러와져요! 쉼표로 여러 명도 돼요!")
         left_layout.addWidget(self.nickname_input)
 
         self.message_label = QLabel("검색하실 채팅 내용을 입력해주세요!")
@@ -157,10 +287,74 @@ class ChatFetcherApp(QWidget):
         self.message_input.setPlaceholderText("요기만 입력하시면 누가 쳤든 상관 없이 입력한 내용이 포함된 모든 채팅이 불러와져요!")
         left_layout.addWidget(self.message_input)
 
+        self.regex_input = QLineEdit()
+        self.regex_input.setPlaceholderText("정규식으로 찾고 싶으시면 여기에! (예: ^ㅋ{5,}$)")
+        left_layout.addWidget(self.regex_input)
+
+        match_option_layout = QHBoxLayout()
+        self.ignore_case_checkbox = QCheckBox("대소문자 무시")
+        self.ignore_width_checkbox = QCheckBox("전각/반각 무시")
+        match_option_layout.addWidget(self.ignore_case_checkbox)
+        match_option_layout.addWidget(self.ignore_width_checkbox)
+        left_layout.addLayout(match_option_layout)
+
         self.fetch_button = QPushButton("채팅 가져오기!")
         self.fetch_button.clicked.connect(self.start_fetching)
+
+        concurrency_layout = QHBoxLayout()
+        concurrency_layout.addWidget(QLabel("동시에 받을 다시보기 수"))
+        self.worker_count_input = QSpinBox()
+        self.worker_count_input.setRange(1, 8)
+        self.worker_count_input.setValue(DEFAULT_MAX_WORKERS)
+        concurrency_layout.addWidget(self.worker_count_input)
+        concurrency_layout.addWidget(QLabel("초당 요청 수"))
+        self.request_rate_input = QDoubleSpinBox()
+        self.request_rate_input.setRange(0.5, 20.0)
+        self.request_rate_input.setSingleStep(0.5)
+        self.request_rate_input.setValue(DEFAULT_REQUESTS_PER_SECOND)
+        concurrency_layout.addWidget(self.request_rate_input)
+        left_layout.addLayout(concurrency_layout)
+
+        self.async_engine_checkbox = QCheckBox("비동기 엔진으로 받기 (스레드 하나로 다시보기 여러 개를 같이 받아요)")
+        self.async_engine_checkbox.toggled.connect(self.update_worker_limit)
+        left_layout.addWidget(self.async_engine_checkbox)
+
         left_layout.addWidget(self.fetch_button)
 
+        self.metrics_label = QLabel()
+        self.metrics_label.setWordWrap(True)
+        left_layout.addWidget(self.metrics_label)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        self.metrics_timer.timeout.connect(self.update_metrics_label)
+
+        watch_layout = QHBoxLayout()
+        self.watch_button = QPushButton("이 채널과 검색 조건 지켜보기")
+        self.watch_button.clicked.connect(self.add_watch)
+        watch_layout.addWidget(self.watch_button)
+        self.watch_checkbox = QCheckBox("새 다시보기 미리 받아두기")
+        self.watch_checkbox.toggled.connect(self.toggle_watch)
+        watch_layout.addWidget(self.watch_checkbox)
+        left_layout.addLayout(watch_layout)
+        self.watch_thread = None
+
+        prefetch_layout = QHBoxLayout()
+        self.prefetch_checkbox = QCheckBox("목록을 불러오면 최신 다시보기 미리 받아두기")
+        self.prefetch_checkbox.toggled.connect(self.toggle_prefetch)
+        prefetch_layout.addWidget(self.prefetch_checkbox)
+        self.prefetch_count_input = QSpinBox()
+        self.prefetch_count_input.setRange(1, 50)
+        self.prefetch_count_input.setValue(PREFETCH_COUNT)
+        self.prefetch_count_input.setSuffix("개")
+        prefetch_layout.addWidget(self.prefetch_count_input)
+        left_layout.addLayout(prefetch_layout)
+        self.prefetch_thread = None
+        self.vod_channel_id = None
+
+        self.local_search_button = QPushButton("저장된 채팅에서 바로 찾기")
+        self.local_search_button.clicked.connect(self.start_local_search)
+        left_layout.addWidget(self.local_search_button)
+
         self.save_button = QPushButton("모든 탭 파일로 저장하기!")
         self.save_button.clicked.connect(self.save_to_file)
         left_layout.addWidget(self.save_button)
@@ -171,7 +365,8 @@ class ChatFetcherApp(QWidget):
         self.chat_tabs.setMinimumWidth(400)
 
         self.chat_tabs.setTabsClosable(True)
-        self.chat_tabs.tab_widget.tabCloseRequested.connect(self.chat_tabs.removeTab)
+        self.chat_tabs.tab_widget.currentChanged.connect(self.touch_tab)
+        self.chat_tabs.tab_removed.connect(self.forget_tab)
 
 
         self.chat_tabs.setStyleSheet("""
@@ -191,62 +386,321 @@ class ChatFetcherApp(QWidget):
 
 
     def start_fetching(self):
-        selected_videos = [cb for cb in self.vod_checkboxes if cb.isChecked()]
+        selected_videos = self.vod_model.checked_video_ids()
         if not selected_videos:
             QMessageBox.warning(self, "다시보기 선택 안됨!", "채팅을 가져올 다시보기를 선택해주세요!")
             return
 
-        nickname = self.nickname_input.text().strip()
-        message = self.message_input.text().strip()
-
-        if not nickname and not message:
-            QMessageBox.warning(self, "하나도 입력 안댐!!", "아무리 그래두 닉네임 또는 채팅 내용 중 하나 이상은 입력해야 해요!")
+        query = self.build_query()
+        if query is None:
             return
 
         QMessageBox.warning(self, "모든 준비 완료!!!", "선택한 영상들의 채팅을 가져올께요!!\n불러와지는 채팅 옆 시간을 누르시면 해당 다시보기로 연결되어요!!")
         self.fetch_button.setEnabled(False)
 
-        self.filtered_chats = []
+        self.found_chat_count = 0
         self.thread_queue = [
-            (cb.video_id, nickname, message)
-            for cb in selected_videos
+            (video_id, query)
+            for video_id in selected_videos
         ]
         self.current_thread_index = 0
+        self.running_thread_count = 0
+        self.failed_videos = []
+        self.rate_limiter.set_rate(self.request_rate_input.value())
+        self.chzzk_client.metrics.reset()
+        self.metrics_timer.start()
 
         self.start_next_thread()
 
 
-    def start_next_thread(self):
-        if self.current_thread_index >= len(self.thread_queue):
-            self.fetch_button.setEnabled(True)
-            QMessageBox.information(self, "완료완료!!", "모든 영상의 채팅 수집이 완료되었습니다!")
+    def build_query(self):
+        """입력칸들로 QuerySet 을 만들어요. 입력이 없거나 정규식이 틀리면 알려주고 None"""
+        try:
+            query = QuerySet.from_filters(
+                self.nickname_input.text().strip(),
+                self.message_input.text().strip(),
+                self.regex_input.text().strip(),
+                self.ignore_case_checkbox.isChecked(),
+                self.ignore_width_checkbox.isChecked(),
+            )
+        except re.error as e:
+            QMessageBox.warning(self, "정규식 오류!", f"정규식을 다시 확인해주세요!\n{e}")
+            return None
+
+        if query.is_empty():
+            QMessageBox.warning(self, "하나도 입력 안댐!!", "아무리 그래두 닉네임 또는 채팅 내용 중 하나 이상은 입력해야 해요!")
+            return None
+
+        return query
+
+    def start_local_search(self):
+        query = self.build_query()
+        if query is None:
             return
 
-        video_id, nickname, message = self.thread_queue[self.current_thread_index]
-        thread = ChatFetcherThread(video_id, nickname, message)
+        self.local_search_button.setEnabled(False)
 
-        thread.finished.connect(thread.deleteLater)
+        thread = LocalSearchThread(self.chat_store, query)
+        thread.vod_found.connect(partial(self.add_local_result_tab, query))
+        thread.search_finished.connect(self.handle_local_search_finished)
 
-        thread.chat_fetched.connect(self.handle_thread_finished)
-        thread.chat_progress.connect(self.append_chat)
+        self.track_thread(thread)
+        thread.start()
 
-        self.live_tab = QTextBrowser()
-        self.live_tab.setOpenExternalLinks(True)
+    def add_local_result_tab(self, query, video_id, meta, chats):
+        self.add_result_tab(video_id, meta, chats, query)
+
+    def add_result_tab(self, video_id, meta, chats, query=None, title_prefix=""):
+        tab = ChatResultTab(video_id, meta, query, self.chat_store)
+        tab.append_chats(chats)
+        tab.finished = True
+        tab.set_status(f"<b>✅ [영상 {video_id}] 채팅 내역 ({len(chats)}개)</b>")
+        self.add_chat_tab(tab, title_prefix + vod_tab_title(video_id, meta["video_title"], meta["publish_date"]))
+        self.request_timeline(tab)
+        self.trim_tabs()
+
+    def add_chat_tab(self, tab, title):
+        self.chat_tabs.addTab(tab, title)
+        if tab not in self.recent_tabs:
+            self.recent_tabs.append(tab)
+
+    def touch_tab(self, index):
+        """보는 탭을 가장 최근으로 올리고, 비워뒀던 탭이면 저장소에서 다시 채워요"""
+        tab = self.chat_tabs.widget(index)
+        if not isinstance(tab, ChatResultTab):
+            return
+
+        tab.ensure_loaded()
+        if tab.needs_timeline:
+            self.start_timeline(tab)
+        if tab in self.recent_tabs:
+            self.recent_tabs.remove(tab)
+        self.recent_tabs.append(tab)
+        self.trim_tabs()
+
+    def trim_tabs(self):
+        """탭들의 채팅 목록이 메모리 한도를 넘으면 가장 오래 안 본 탭부터 비워요. 보는 탭과 받는 중인 탭은 그대로 둬요"""
+        used = sum(tab.memory_bytes() for tab in self.recent_tabs)
+        current = self.chat_tabs.widget(self.chat_tabs.currentIndex())
+
+        for tab in list(self.recent_tabs):
+            if used <= self.tab_memory_budget:
+                break
+            if tab is current or not tab.can_unload():
+                continue
+            used -= tab.memory_bytes()
+            tab.unload()
+            log.debug("[탭] %s 의 채팅 %d개를 비워뒀어요", tab.video_id, tab.chat_count)
+
+    def forget_tab(self, tab):
+        if tab in self.recent_tabs:
+            self.recent_tabs.remove(tab)
+        if tab.timeline_thread is not None:
+            # 닫힌 탭에 그릴 띠는 더 계산하지 않아요
+            tab.timeline_thread.stop()
+        for video_id, live_tab in list(self.live_tabs.items()):
+            if live_tab is tab:
+                # 탭만 닫혀요. 수집은 계속해서 저장소에 쌓아요
+                del self.live_tabs[video_id]
+
+    def add_watch(self):
+        """입력한 채널과 지금 검색 조건을 저장소에 넣어두고 지켜보기를 켜요"""
+        channel_id = parse_channel_id(self.channel_url_input.text().strip())
+        if not channel_id:
+            QMessageBox.warning(self, "채널 링크 확인!", "지켜볼 채널 홈 링크를 입력해주세요!")
+            return
+
+        query = self.build_query()
+        if query is None:
+            return
+
+        self.chat_store.watch_channel(channel_id)
+        self.chat_store.save_query(query.describe(), query.to_spec(), channel_id)
+        QMessageBox.information(
+            self, "지켜보기!",
+            f"이 채널에 새 다시보기가 올라오면 미리 받아두고\n[{query.describe()}] 에 맞는 채팅을 탭으로 띄워드릴께요!",
+        )
+        self.watch_checkbox.setChecked(True)
+
+    def toggle_watch(self, enabled):
+        if enabled:
+            self.start_watch()
+        elif self.watch_thread is not None:
+            self.watch_thread.stop()
+
+    def start_watch(self):
+        # 끄던 지켜보기가 아직 받던 걸 정리하는 중이면, 끝난 다음에 forget_watch 에서 다시 켜요
+        if self.watch_thread is not None:
+            return
+
+        # 사람이 누른 수집이 돌고 있으면 지켜보기는 잠깐 비켜줘요
+        self.watch_thread = WatchThread(self.chat_store, lambda: self.running_thread_count > 0, self.chat_archive)
+        self.watch_thread.vod_matched.connect(self.add_watch_result_tab)
+        self.watch_thread.finished.connect(partial(self.forget_watch, self.watch_thread))
+        self.track_thread(self.watch_thread)
+        self.watch_thread.start()
+
+    def forget_watch(self, thread):
+        if self.watch_thread is thread:
+            self.watch_thread = None
+            if self.watch_checkbox.isChecked():
+                self.start_watch()
+
+    def toggle_prefetch(self, enabled):
+        if enabled:
+            self.start_prefetch()
+        else:
+            self.stop_prefetch()
+
+    def start_prefetch(self):
+        """목록의 최신 다시보기 몇 개를 뒤에서 받아둬요. 사람이 누른 수집이 돌고 있으면 끝날 때까지 비켜줘요"""
+        self.stop_prefetch()
+        vods = self.vod_model.vods[:self.prefetch_count_input.value()]
+        if not vods:
+            return
+
+        self.prefetch_thread = PrefetchThread(
+            self.chat_store, vods, self.vod_channel_id, lambda: self.running_thread_count > 0, self.chat_archive,
+        )
+        self.prefetch_thread.vod_matched.connect(self.add_watch_result_tab)
+        self.prefetch_thread.finished.connect(partial(self.forget_prefetch, self.prefetch_thread))
+        self.track_thread(self.prefetch_thread)
+        self.prefetch_thread.start(QThread.IdlePriority)
+
+    def stop_prefetch(self):
+        if self.prefetch_thread is not None:
+            self.prefetch_thread.stop()
+            self.prefetch_thread = None
+
+    def forget_prefetch(self, thread):
+        if self.prefetch_thread is thread:
+            self.prefetch_thread = None
+
+    def add_watch_result_tab(self, query_name, meta, chats):
+        log.info("[지켜보기] %s 에서 [%s] 에 맞는 채팅 %d개", meta["video_no"], query_name, len(chats))
+        spec = {name: spec for name, _, spec in self.chat_store.saved_queries(meta["channel_id"] or "")}.get(query_name)
+        query = QuerySet.from_spec(spec) if spec is not None else None
+        self.add_result_tab(str(meta["video_no"]), meta, chats, query, title_prefix="🔔 ")
+
+    def request_timeline(self, tab):
+        """보고 있는 탭이면 바로, 아니면 처음 볼 때 타임라인을 계산해요
+
+        다시보기 몇백 개를 한 번에 찾아도 타임라인 스레드는 사람이 본 탭만큼만 떠요.
+        """
+        if tab is self.chat_tabs.widget(self.chat_tabs.currentIndex()):
+            self.start_timeline(tab)
+        else:
+            tab.needs_timeline = True
+
+    def start_timeline(self, tab):
+        tab.needs_timeline = False
+        vod = self.vod_model.find(tab.video_id)
+        duration_ms = (vod.get("duration") or 0) * 1000 if vod else None
+        thread = TimelineThread(self.chat_store, tab.video_id, [chat.time_ms for chat in tab.model.chats], duration_ms)
+        thread.timeline_ready.connect(tab.set_timeline)
+        thread.finished.connect(partial(self.forget_timeline, tab, thread))
+        if tab.timeline_thread is not None:
+            # 채팅이 더 들어와서 다시 계산하면 예전 계산은 버려요
+            tab.timeline_thread.stop()
+        tab.timeline_thread = thread
+
+        self.track_thread(thread)
+        thread.start()
+
+    def forget_timeline(self, tab, thread):
+        if tab.timeline_thread is thread:
+            tab.timeline_thread = None
+
+    def handle_local_search_finished(self, vod_count, chat_count):
+        self.local_search_button.setEnabled(True)
+        if vod_count:
+            QMessageBox.information(self, "찾았어요!", f"저장된 다시보기 {vod_count}개에서 {chat_count}개의 채팅을 찾았어요!")
+        else:
+            QMessageBox.information(self, "없어요 ㅠ", "저장된 다시보기 중에는 맞는 채팅이 없어요 ㅠ\n다시보기를 골라서 채팅 가져오기를 눌러주세요!")
+
+    def start_next_thread(self):
+        """동시에 받을 수 있는 만큼 대기열에서 다시보기를 꺼내 수집을 시작해요"""
+        max_workers = self.worker_count_input.value()
+
+        while self.running_thread_count < max_workers and self.current_thread_index < len(self.thread_queue):
+            video_id, query = self.thread_queue[self.current_thread_index]
+            self.current_thread_index += 1
+            self.start_thread(video_id, query)
+
+        if self.running_thread_count == 0:
+            self.fetch_button.setEnabled(True)
+            self.finish_metrics()
+            failed = f"\n실패한 다시보기: {len(self.failed_videos)}개" if self.failed_videos else ""
+            QMessageBox.information(
+                self, "완료완료!!",
+                f"모든 영상의 채팅 수집이 완료되었습니다!\n다시보기 {len(self.thread_queue)}개에서 {self.found_chat_count}개의 채팅을 찾았어요!{failed}"
+            )
+
+    def update_worker_limit(self, use_async):
+        # 비동기 엔진은 다시보기마다 스레드를 안 띄우니까 더 많이 같이 받아도 돼요
+        self.worker_count_input.setMaximum(32 if use_async else 8)
+
+    def start_thread(self, video_id, query):
+        if self.async_engine_checkbox.isChecked() and self.async_bridge.is_running(video_id):
+            # 같은 다시보기를 또 넣으면 live_tabs 와 엔진의 수집기가 덮여서 먼저 연 탭이 안 끝나요
+            log.warning("[%s] 이미 비동기 엔진이 받고 있어서 건너뛰어요", video_id)
+            return
+
+        matching_vod = self.vod_model.find(video_id)
+        duration_ms = (matching_vod.get("duration") or 0) * 1000 if matching_vod else 0
 
-        matching_vod = next((vod for vod in self.vod_data_list if str(vod["videoNo"]) == video_id), None)
         if matching_vod:
-            publish_date = matching_vod["publishDate"].split(" ")[0]
-            tab_title = f'{publish_date} - {matching_vod["videoTitle"]}'
+            tab_title = vod_tab_title(video_id, matching_vod["videoTitle"], matching_vod["publishDate"])
+            meta = vod_meta(
+                video_id, matching_vod["videoTitle"], matching_vod["publishDate"],
+                (matching_vod.get("channel") or {}).get("channelId"),
+            )
         else:
-            tab_title = f'영상 {video_id}'
+            tab_title = vod_tab_title(video_id, None, None)
+            meta = vod_meta(video_id)
 
-        self.chat_tabs.addTab(self.live_tab, tab_title)
+        live_tab = ChatResultTab(video_id, meta, query, self.chat_store)
+        self.live_tabs[video_id] = live_tab
 
+        self.add_chat_tab(live_tab, tab_title)
+
+        self.running_thread_count += 1
+        if self.async_engine_checkbox.isChecked():
+            self.async_bridge.submit(video_id, query, duration_ms)
+            return
+
+        thread = ChatFetcherThread(video_id, query, self.chat_store, self.chzzk_client, duration_ms, self.chat_archive)
+        thread.chat_fetched.connect(self.handle_thread_finished)
+        thread.chat_progress.connect(self.append_chat)
+        thread.fetch_progress.connect(self.update_progress)
+
+        self.track_thread(thread)
+        thread.start()
+
+    def track_thread(self, thread):
+        """closeEvent 에서 멈출 수 있게 기억해두고, 끝나면 목록에서 빼고 지워요"""
         if not hasattr(self, "threads"):
             self.threads = []
 
         self.threads.append(thread)
-        thread.start()
+        thread.finished.connect(self.forget_thread)
+
+    def forget_thread(self):
+        thread = self.sender()
+        if thread in self.threads:
+            self.threads.remove(thread)
+        thread.deleteLater()
+
+    def handle_async_events(self, events):
+        """비동기 엔진이 모아 보낸 이벤트를 스레드 시그널과 같은 슬롯으로 나눠줘요"""
+        for event in events:
+            kind, video_id = event[0], event[1]
+            if kind == "chats":
+                self.append_chat(event[2], video_id)
+            elif kind == "progress":
+                self.update_progress(video_id, event[2], -1.0 if event[3] is None else event[3])
+            elif kind == "finished":
+                self.handle_thread_finished(event[2], event[3], video_id)
 
 
     def display_chats_per_video(self, chats, error_message, video_id):
@@ -266,39 +720,69 @@ class ChatFetcherApp(QWidget):
 
 
     def handle_thread_finished(self, chats, error_message, video_id):
-        if not hasattr(self, "live_tab"):
-            return
+        live_tab = self.live_tabs.pop(video_id, None)
+        self.found_chat_count += len(chats)
+        if error_message:
+            self.failed_videos.append(video_id)
 
+        if live_tab is not None:
+            self.finish_live_tab(live_tab, chats, error_message, video_id)
+        self.running_thread_count -= 1
+        self.start_next_thread()
+
+    def finish_live_tab(self, live_tab, chats, error_message, video_id):
+        live_tab.finished = True
         if error_message:
-            self.live_tab.append(f"<b>🚨 [{video_id}] 오류:</b> {error_message}<br>")
+            live_tab.set_status(f"<b>🚨 [{video_id}] 오류:</b> {error_message}")
         elif chats:
             count = len(chats)
-            self.live_tab.append(f"<br><b>✅ [영상 {video_id}] 채팅 내역 ({count}개)</b><br><br>")
+            live_tab.set_status(f"<b>✅ [영상 {video_id}] 채팅 내역 ({count}개)</b>")
         else:
-            self.live_tab.append(f"<b>🚨 [영상 {video_id}] 해당 닉네임의 채팅을 찾을 수 없어요 ㅠ</b><br><br>")
+            live_tab.set_status(f"<b>🚨 [영상 {video_id}] 해당 닉네임의 채팅을 찾을 수 없어요 ㅠ</b>")
 
-        matching_vod = next((vod for vod in self.vod_data_list if str(vod["videoNo"]) == video_id), None)
+        matching_vod = self.vod_model.find(video_id)
         if matching_vod:
-            publish_date = matching_vod["publishDate"].split(" ")[0]
-            tab_title = f'{publish_date} - {matching_vod["videoTitle"]}'
+            tab_title = vod_tab_title(video_id, matching_vod["videoTitle"], matching_vod["publishDate"])
         else:
-            tab_title = f'영상 {video_id}'
+            tab_title = vod_tab_title(video_id, None, None)
 
-        index = self.chat_tabs.indexOf(self.live_tab)
+        index = self.chat_tabs.indexOf(live_tab)
         if index != -1:
             self.chat_tabs.setTabText(index, tab_title)
 
-        self.filtered_chats.extend(chats)
-        self.current_thread_index += 1
-        self.start_next_thread()
+        if not error_message:
+            self.request_timeline(live_tab)
+        self.trim_tabs()
+
+
+
+
 
+    def update_progress(self, video_id, fraction, eta):
+        live_tab = self.live_tabs.get(video_id)
+        if live_tab is not None:
+            remaining = format_eta(eta if eta >= 0 else None)
+            live_tab.set_status(f"<b>⏳ [영상 {video_id}] 수집 중 {fraction:.0%} · 남은 시간 약 {remaining}</b>")
 
+    def update_metrics_label(self):
+        self.metrics_label.setText(self.chzzk_client.metrics.summary())
 
+    def finish_metrics(self):
+        """수집이 다 끝나면 통계를 로그에 남기고, ANTYS_METRICS_FILE 이 있으면 거기에도 적어요"""
+        self.metrics_timer.stop()
+        self.update_metrics_label()
+        log.info("수집 통계: %s", self.chzzk_client.metrics.summary())
 
+        metrics_path = os.environ.get("ANTYS_METRICS_FILE")
+        if metrics_path:
+            self.chzzk_client.metrics.write(
+                metrics_path, vods=len(self.thread_queue), chats=self.found_chat_count, failed=self.failed_videos,
+            )
 
-    def append_chat(self, chat_line):
-        if hasattr(self, "live_tab"):
-            self.live_tab.append(chat_line)
+    def append_chat(self, chats, video_id):
+        live_tab = self.live_tabs.get(video_id)
+        if live_tab is not None:
+            live_tab.append_chats(chats)
 
 
     def display_chats(self, chats, error_message):
@@ -322,120 +806,84 @@ class ChatFetcherApp(QWidget):
             QMessageBox.information(self, "저장 실패", "저장할 채팅 탭이 없어요...")
             return
 
-        file_name, _ = QFileDialog.getSaveFileName(self, "파일 저장", "chat_log.txt", "Text Files (*.txt);;All Files (*)")
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "파일 저장", "chat_log.txt", EXPORT_FILE_FILTER)
         if file_name:
-            with open(file_name, "w", encoding="utf-8") as file:
-                total_chat_count = 0
-
-                for i in range(self.chat_tabs.count()):
-                    tab = self.chat_tabs.widget(i)
-                    title = self.chat_tabs.tabText(i)
-                    url_text = tab.toHtml().strip()
-                    plain_text = tab.toPlainText().strip()
-
-                    lines = plain_text.splitlines()
-                    chat_lines = [line.strip() for line in lines if line.strip() and not line.startswith("🚨")]
-
-                    video_url = "https://chzzk.naver.com/"
-                    match = re.search(r'<a href="(https://chzzk\.naver\.com/video/\d+)', url_text)
-                    if match:
-                        video_url = match.group(1)
-
-                    file.write(f"===== {title} =====\n")
-                    file.write(f"{video_url}\n")
-                    file.write(f"총 채팅 수: {len(chat_lines)}개\n\n")
-
-                    for line in chat_lines:
-                        file.write(line + "\n")
+            tabs = [self.chat_tabs.widget(i) for i in range(self.chat_tabs.count())]
+            groups = ((tab.meta, tab.chats()) for tab in tabs if isinstance(tab, ChatResultTab))
+            fmt = guess_format(file_name, EXPORT_FILE_FILTERS.get(selected_filter, "txt"))
+            selected_vod_count, total_chat_count = export_chats(file_name, groups, fmt)
 
-                    file.write("\n\n")
-                    total_chat_count += len(chat_lines)
-
-            selected_vod_count = self.chat_tabs.count()
             QMessageBox.information(self, "저장 완료", f"총 {selected_vod_count}개의 다시보기 속 {total_chat_count}개의 채팅이 저장되었어요! 짝짝짝")
 
 
 
     def closeEvent(self, event):
+        self.thread_queue = self.thread_queue[:self.current_thread_index]
+        # 끝나는 지켜보기 스레드가 forget_watch 에서 다시 켜지지 않게 먼저 꺼둬요
+        self.watch_checkbox.setChecked(False)
         try:
             for thread in getattr(self, "threads", []):
                 if thread.isRunning():
-                    print(f"[종료 시도] {thread.video_id}")
+                    log.debug("[종료 시도] %s", getattr(thread, "video_id", ""))
                     thread.stop()
                     thread.quit()
                     thread.wait()
-                    print(f"[종료 완료] {thread.video_id}")
-        except Exception as e:
-            print(f"스레드 종료 중 오류 발생: {e}")
+                    log.debug("[종료 완료] %s", getattr(thread, "video_id", ""))
+        except Exception:
+            log.exception("스레드 종료 중 오류 발생")
+        # 비동기 엔진은 태스크를 모두 취소하고 이벤트 루프 스레드가 끝날 때까지 기다려요
+        self.async_bridge.stop()
         event.accept()
 
 
     def load_vod_list(self):
         url = self.channel_url_input.text().strip()
-        match = re.search(r'/([a-z0-9]{32})$', url)
-        if not match:
+        channel_id = parse_channel_id(url)
+        if not channel_id:
             QMessageBox.warning(self, "인식 불가!", "인식 가능한 링크가 아니에요!\n팔로우 목록에서 스트리머 분 누르면 나오는 그 페이지의 링크가 필요해요!")
             return
 
-        channel_id = match.group(1)
-        print(f"채널 ID 추출됨: {channel_id}")
-
-        self.vod_checkboxes.clear()
-        for i in reversed(range(self.vod_list_layout.count())):
-            self.vod_list_layout.itemAt(i).widget().setParent(None)
+        log.info("채널 ID 추출됨: %s", channel_id)
 
-        self.vod_data_list = []
-        page = 0
+        self.stop_prefetch()
+        self.vod_channel_id = channel_id
+        self.vod_model.clear()
+        self.load_vods_button.setEnabled(False)
 
-        while True:
-            api_url = (
-                f"https://api.chzzk.naver.com/service/v1/channels/"
-                f"{channel_id}/videos?sortType=LATEST&pagingType=PAGE&page={page}&size=18"
-            )
-
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
-                "Referer": "https://chzzk.naver.com/"
-            }
+        thread = VodListThread(self.chzzk_client, self.chat_store, channel_id)
+        thread.vods_found.connect(self.vod_model.add_vods)
+        thread.list_finished.connect(self.handle_vod_list_finished)
 
-            response = requests.get(api_url, headers=headers, timeout=10)
-
-            if response.status_code != 200:
-                QMessageBox.critical(self, "에러에러", f"다시보기를 가져오는 데 실패했어요 ㅠㅠㅠ\n옆에 코드를 카페나 다른 방법을 통해 저에게 불러주시면 도와드릴께요 ㅠ \n코드: {response.status_code}")
-                return
+        self.track_thread(thread)
+        thread.start()
 
-            data = response.json().get("content", {}).get("data", [])
-            if not data:
-                break
+    def handle_vod_list_finished(self, vod_count, error_message):
+        self.load_vods_button.setEnabled(True)
 
-            self.vod_data_list.extend(data)
-            for video in data:
-                title = video["videoTitle"]
-                date = video["publishDate"].split(" ")[0]
-                video_id = video["videoId"]
-                checkbox = QCheckBox(f"{date} - {title}")
-                checkbox.video_id = str(video["videoNo"])
-                self.vod_list_layout.addWidget(checkbox)
-                self.vod_checkboxes.append(checkbox)
+        if error_message:
+            QMessageBox.critical(self, "에러에러", f"다시보기를 가져오는 데 실패했어요 ㅠㅠㅠ\n옆에 코드를 카페나 다른 방법을 통해 저에게 불러주시면 도와드릴께요 ㅠ \n코드: {error_message}")
+            return
 
-            page += 1
+        QMessageBox.information(self, "있었어요!", f"총 {vod_count}개의 다시보기를 불러왔어용 ㅎㅎ\n채팅을 불러올 다시보기를 선택해주세요!")
+        if self.prefetch_checkbox.isChecked():
+            self.start_prefetch()
 
-        QMessageBox.information(self, "있었어요!", f"총 {len(self.vod_checkboxes)}개의 다시보기를 불러왔어용 ㅎㅎ\n채팅을 불러올 다시보기를 선택해주세요!")
+    def update_vod_filter(self):
+        self.vod_proxy_model.set_filter(
+            self.vod_title_filter.text().strip(), self.vod_date_from.date(), self.vod_date_to.date(),
+        )
 
     def toggle_all_checkboxes(self):
-        if not self.vod_checkboxes:
+        """지금 걸러져서 보이는 다시보기만 한 번에 선택하거나 해제해요"""
+        video_ids = self.vod_proxy_model.visible_video_ids()
+        if not video_ids:
             return
 
         if not self.select_all_warned:
             QMessageBox.information(self, "경고!!", "너무 많은 데이터를 상습적으로 불러올 경우 서버에 부하가 가서 네이버가 화를 많이 낼 수 있어요!!")
             self.select_all_warned = True
 
-        if any(not cb.isChecked() for cb in self.vod_checkboxes):
-            for cb in self.vod_checkboxes:
-                cb.setChecked(True)
-        else:
-            for cb in self.vod_checkboxes:
-                cb.setChecked(False)
+        self.vod_model.set_checked(video_ids, not self.vod_model.all_checked(video_ids))
 
     def go_to_previous_tab(self):
         current_index = self.chat_tabs.currentIndex()
@@ -449,13 +897,15 @@ class ChatFetcherApp(QWidget):
 
 
 class ClosableTabWidget(QWidget):
+    tab_removed = Signal(object)
+
     def __init__(self):
         super().__init__()
 
         self.tab_widget = QTabWidget()
 
         self.tab_widget.setTabsClosable(True)
-        self.tab_widget.tabCloseRequested.connect(self.tab_widget.removeTab)
+        self.tab_widget.tabCloseRequested.connect(self.removeTab)
 
         self.tab_widget.setContextMenuPolicy(Qt.CustomContextMenu)
         self.tab_widget.customContextMenuRequested.connect(self.show_tab_context_menu)
@@ -494,7 +944,12 @@ class ClosableTabWidget(QWidget):
         self.tab_widget.addTab(widget, title)
 
     def removeTab(self, index):
+        # QTabWidget.removeTab 은 탭 위젯을 안 지워서, 닫은 탭의 채팅이 계속 남지 않게 직접 지워요
+        widget = self.tab_widget.widget(index)
         self.tab_widget.removeTab(index)
+        if widget is not None:
+            self.tab_removed.emit(widget)
+            widget.deleteLater()
 
     def setCurrentIndex(self, index):
         self.tab_widget.setCurrentIndex(index)
@@ -549,40 +1004,413 @@ class ClosableTabWidget(QWidget):
 
     def save_single_tab(self, index):
         tab = self.tab_widget.widget(index)
+        if not isinstance(tab, ChatResultTab):
+            return
         title = self.tab_widget.tabText(index)
-        url_text = tab.toHtml().strip()
-        plain_text = tab.toPlainText().strip()
 
+        file_name, selected_filter = QFileDialog.getSaveFileName(self, "선택된 탭만 저장하는 중!", f"{title}.txt", EXPORT_FILE_FILTER)
+        if file_name:
+            fmt = guess_format(file_name, EXPORT_FILE_FILTERS.get(selected_filter, "txt"))
+            export_chats(file_name, [(tab.meta, tab.chats())], fmt)
 
-        lines = plain_text.splitlines()
-        chat_lines = [line.strip() for line in lines if line.strip() and not line.startswith("🚨")]
+            QMessageBox.information(self, "저장 완료!", f"'{title}'의 채팅 내역이 저장되었어요!")
 
 
-        video_url = "https://chzzk.naver.com/"
-        match = re.search(r'<a href="(https://chzzk\.naver\.com/video/\d+)', url_text)
+class VodListModel(QAbstractListModel):
+    """체크할 수 있는 다시보기 목록 (최신순). 줄마다 위젯을 만들지 않아서 몇천 개도 가벼워요"""
+    VideoIdRole = Qt.UserRole + 1
+    TitleRole = Qt.UserRole + 2
+    DateRole = Qt.UserRole + 3
 
+    def __init__(self):
+        super().__init__()
+        self.vods = []  # 목록 API 모양의 dict, videoNo 내림차순
+        self.checked = set()
+        self._by_id = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.vods)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        vod = self.vods[index.row()]
+        if role == Qt.DisplayRole:
+            return f'{vod["publishDate"].split(" ")[0]} - {vod["videoTitle"]}'
+        if role == Qt.CheckStateRole:
+            return Qt.Checked if str(vod["videoNo"]) in self.checked else Qt.Unchecked
+        if role == self.VideoIdRole:
+            return str(vod["videoNo"])
+        if role == self.TitleRole:
+            return vod["videoTitle"]
+        if role == self.DateRole:
+            return vod["publishDate"].split(" ")[0]
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+
+        video_id = str(self.vods[index.row()]["videoNo"])
+        if Qt.CheckState(value) == Qt.Checked:
+            self.checked.add(video_id)
+        else:
+            self.checked.discard(video_id)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def clear(self):
+        self.beginResetModel()
+        self.vods = []
+        self.checked = set()
+        self._by_id = {}
+        self.endResetModel()
+
+    def add_vods(self, vods):
+        """받아온 다시보기를 최신순 자리에 넣어요. 저장된 목록 뒤에 새 다시보기가 와도 맨 위로 가요"""
+        vods = sorted(
+            (vod for vod in vods if str(vod["videoNo"]) not in self._by_id),
+            key=lambda vod: int(vod["videoNo"]), reverse=True,
+        )
+        if not vods:
+            return
 
-        if match:
-            video_url = match.group(1)            
+        for vod in vods:
+            self._by_id[str(vod["videoNo"])] = vod
+
+        # 보통은 페이지가 순서대로 오니까 끝이나 맨 앞에 한 번에 붙여요
+        if not self.vods or int(vods[0]["videoNo"]) < int(self.vods[-1]["videoNo"]):
+            first = len(self.vods)
+            self.beginInsertRows(QModelIndex(), first, first + len(vods) - 1)
+            self.vods.extend(vods)
+            self.endInsertRows()
+        elif int(vods[-1]["videoNo"]) > int(self.vods[0]["videoNo"]):
+            self.beginInsertRows(QModelIndex(), 0, len(vods) - 1)
+            self.vods[:0] = vods
+            self.endInsertRows()
         else:
-            print("")
+            self.beginResetModel()
+            self.vods = sorted(self.vods + vods, key=lambda vod: int(vod["videoNo"]), reverse=True)
+            self.endResetModel()
 
+    def find(self, video_id):
+        return self._by_id.get(str(video_id))
 
-        file_name, _ = QFileDialog.getSaveFileName(self, "선택된 탭만 저장하는 중!", f"{title}.txt", "Text Files (*.txt);;All Files (*)")
-        if file_name:
-            with open(file_name, "w", encoding="utf-8") as file:
-                file.write(f"===== {title} =====\n")
-                file.write(f"{video_url}\n")
-                file.write(f"총 채팅 수: {len(chat_lines)}개\n\n")
+    def checked_video_ids(self):
+        """체크된 다시보기 ID 를 목록 순서(최신순)대로 돌려줘요"""
+        return [str(vod["videoNo"]) for vod in self.vods if str(vod["videoNo"]) in self.checked]
 
-                for line in chat_lines:
-                    line = re.sub(r'<a href="[^"]+">([^<]+)</a>', r'\1', line)
-                    file.write(line + "\n")
+    def all_checked(self, video_ids):
+        return all(video_id in self.checked for video_id in video_ids)
 
-            QMessageBox.information(self, "저장 완료!", f"'{title}'의 채팅 내역이 저장되었어요!")
+    def set_checked(self, video_ids, checked):
+        """여러 다시보기를 한 번에 체크하거나 풀고 화면 갱신도 한 번만 해요"""
+        if checked:
+            self.checked.update(video_ids)
+        else:
+            self.checked.difference_update(video_ids)
+        if self.vods:
+            self.dataChanged.emit(self.index(0), self.index(len(self.vods) - 1), [Qt.CheckStateRole])
+
+
+class VodFilterProxyModel(QSortFilterProxyModel):
+    """다시보기 목록을 제목과 날짜 범위로 바로바로 걸러줘요"""
+    NO_DATE = QDate(2000, 1, 1)
+
+    def __init__(self):
+        super().__init__()
+        # 체크 상태가 바뀌어도 다시 거를 필요가 없어요 (새로 들어온 줄은 그래도 걸러져요)
+        self.setDynamicSortFilter(False)
+        self.title_filter = ""
+        self.date_from = None
+        self.date_to = None
+
+    def set_filter(self, title, date_from, date_to):
+        self.title_filter = title.casefold()
+        self.date_from = None if date_from == self.NO_DATE else date_from.toString("yyyy-MM-dd")
+        self.date_to = None if date_to == self.NO_DATE else date_to.toString("yyyy-MM-dd")
+        self.invalidateFilter()
+
+    def accepts(self, vod):
+        if self.title_filter and self.title_filter not in vod["videoTitle"].casefold():
+            return False
+
+        date = vod["publishDate"].split(" ")[0]
+        if self.date_from and date < self.date_from:
+            return False
+        if self.date_to and date > self.date_to:
+            return False
+        return True
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        # Qt 인덱스를 거치지 않고 원본 목록을 바로 봐야 몇천 줄도 금방 걸러져요
+        return self.accepts(self.sourceModel().vods[source_row])
+
+    def visible_video_ids(self):
+        return [str(vod["videoNo"]) for vod in self.sourceModel().vods if self.accepts(vod)]
+
+
+class ChatListModel(QAbstractListModel):
+    """한 다시보기에서 찾은 채팅 목록. 보이는 줄만 그려지도록 QListView 에 붙여 써요"""
+    TimeRole = Qt.UserRole + 1
+    TextRole = Qt.UserRole + 2
+    UrlRole = Qt.UserRole + 3
+
+    def __init__(self, video_id):
+        super().__init__()
+        self.video_id = video_id
+        self.chats = []  # ChatRecord 목록
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.chats)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+
+        chat = self.chats[index.row()]
+        if role == Qt.DisplayRole:
+            return chat.plain_text()
+        if role == self.TimeRole:
+            return chat.timestamp()
+        if role == self.TextRole:
+            return f"{chat.nickname}: {chat.message}"
+        if role == self.UrlRole:
+            return chat.url()
+        if role == Qt.ToolTipRole:
+            if chat.matched:
+                return f"{chat.message}\n[{', '.join(chat.matched)}]"
+            return chat.message
+        return None
+
+    def append_chats(self, chats):
+        if not chats:
+            return
+        first = len(self.chats)
+        self.beginInsertRows(QModelIndex(), first, first + len(chats) - 1)
+        self.chats.extend(chats)
+        self.endInsertRows()
+
+    def set_chats(self, chats):
+        self.beginResetModel()
+        self.chats = list(chats)
+        self.endResetModel()
+
+
+class ChatItemDelegate(QStyledItemDelegate):
+    """왼쪽 시간은 링크처럼 그리고, 누르면 그 시간대의 다시보기를 열어줘요"""
+    MARGIN = 4
+
+    def time_rect(self, option, index):
+        time_text = index.data(ChatListModel.TimeRole)
+        rect = option.rect.adjusted(self.MARGIN, 0, 0, 0)
+        rect.setWidth(option.fontMetrics.horizontalAdvance(time_text))
+        return rect
+
+    def paint(self, painter, option, index):
+        painter.save()
+        if option.state & QStyle.State_Selected:
+            painter.fillRect(option.rect, option.palette.highlight())
+            text_color = option.palette.highlightedText().color()
+        else:
+            text_color = option.palette.text().color()
+
+        time_rect = self.time_rect(option, index)
+        link_font = option.font
+        link_font.setUnderline(True)
+        painter.setFont(link_font)
+        painter.setPen(option.palette.link().color())
+        painter.drawText(time_rect, Qt.AlignVCenter | Qt.AlignLeft, index.data(ChatListModel.TimeRole))
+
+        link_font.setUnderline(False)
+        painter.setFont(link_font)
+        painter.setPen(text_color)
+        text_rect = option.rect.adjusted(time_rect.right() - option.rect.left() + 1, 0, 0, 0)
+        text = option.fontMetrics.elidedText(f" - {index.data(ChatListModel.TextRole)}", Qt.ElideRight, text_rect.width())
+        painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if (event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton
+                and self.time_rect(option, index).contains(event.position().toPoint())):
+            QDesktopServices.openUrl(QUrl(index.data(ChatListModel.UrlRole)))
+            return True
+        return super().editorEvent(event, model, option, index)
+
+
+class ChatDensityStrip(QWidget):
+    """다시보기 전체에서 채팅이 얼마나 몰렸는지 보여주는 띠. 누르면 그 시간대로 가요
+
+    위쪽 회색은 저장된 모든 채팅, 아래쪽 색깔은 검색에 걸린 채팅이에요. 각자 가장 많은 칸을 꽉 차게 그려요.
+    """
+    HEIGHT = 36
+
+    def __init__(self, video_id):
+        super().__init__()
+        self.video_id = video_id
+        self.overall = None
+        self.matched = None
+        self.setFixedHeight(self.HEIGHT)
+        self.setMouseTracking(True)
+        self.setCursor(Qt.PointingHandCursor)
+        self.hide()
+
+    def set_counts(self, overall, matched):
+        self.overall = None if overall is None else list(map(int, overall))
+        self.matched = None if matched is None else list(map(int, matched))
+        self.setVisible(bool(self.overall or self.matched))
+        self.update()
+
+    def bin_count(self):
+        return len(self.overall or self.matched or [])
+
+    def bin_at(self, x):
+        bins = self.bin_count()
+        if not bins or self.width() <= 0:
+            return None
+        return min(bins - 1, max(0, int(x * bins / self.width())))
+
+    def paintEvent(self, event):
+        bins = self.bin_count()
+        if not bins:
+            return
+
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        half = self.height() / 2
+        width = self.width() / bins
+
+        for counts, top, color in (
+            (self.overall, 0, QColor(150, 150, 150)),
+            (self.matched, half, self.palette().highlight().color()),
+        ):
+            if not counts:
+                continue
+            peak = max(counts) or 1
+            for index, count in enumerate(counts):
+                if count:
+                    bar = half * count / peak
+                    painter.fillRect(QRectF(index * width, top + half - bar, max(1.0, width), bar), color)
+        painter.end()
+
+    def mouseMoveEvent(self, event):
+        index = self.bin_at(event.position().x())
+        if index is None:
+            return
+        parts = [format_timestamp(index * TIMELINE_BIN_MS)]
+        if self.overall:
+            parts.append(f"전체 {self.overall[index]}개")
+        if self.matched:
+            parts.append(f"찾은 채팅 {self.matched[index]}개")
+        self.setToolTip(" · ".join(parts))
+
+    def mousePressEvent(self, event):
+        index = self.bin_at(event.position().x())
+        if index is not None and event.button() == Qt.LeftButton:
+            QDesktopServices.openUrl(QUrl(video_time_url(self.video_id, index * TIMELINE_BIN_MS)))
+
+
+class ChatResultTab(QWidget):
+    """다시보기 하나의 검색 결과 탭: 채팅 목록 + 맨 아래 상태 줄
+
+    query 와 store 를 주면 다 받은 탭은 unload() 로 채팅 목록을 비웠다가, 다시 볼 때 저장소에서 다시 찾아 채워요.
+    """
+
+    def __init__(self, video_id, meta=None, query=None, store=None):
+        super().__init__()
+        self.video_id = video_id
+        self.meta = meta or vod_meta(video_id)
+        self.query = query
+        self.store = store
+        self.model = ChatListModel(video_id)
+        self.chat_count = 0
+        self.finished = False
+        self.loaded = True
+        self._top_row = 0
+        self.timeline_thread = None
+        self.needs_timeline = False
+
+        self.view = QListView()
+        self.view.setModel(self.model)
+        self.view.setUniformItemSizes(True)
+        self.view.setItemDelegate(ChatItemDelegate(self.view))
+        self.view.setSelectionMode(QListView.ExtendedSelection)
+
+        self.density_strip = ChatDensityStrip(video_id)
+        self.spikes_label = QLabel()
+        self.spikes_label.setTextFormat(Qt.RichText)
+        self.spikes_label.setOpenExternalLinks(True)
+        self.spikes_label.setWordWrap(True)
+        self.spikes_label.hide()
+
+        self.status_label = QLabel()
+        self.status_label.setTextFormat(Qt.RichText)
+        self.status_label.setWordWrap(True)
+
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.density_strip)
+        layout.addWidget(self.spikes_label)
+        layout.addWidget(self.view)
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+    def append_chats(self, chats):
+        scrollbar = self.view.verticalScrollBar()
+        at_bottom = scrollbar.value() == scrollbar.maximum()
+        self.model.append_chats(chats)
+        self.chat_count += len(chats)
+        if at_bottom:
+            self.view.scrollToBottom()
+
+    def memory_bytes(self):
+        return len(self.model.chats) * CHAT_RECORD_BYTES
+
+    def can_unload(self):
+        return self.finished and self.loaded and self.model.chats and self.query is not None and self.store is not None
+
+    def unload(self):
+        """보던 줄만 기억해두고 채팅 목록을 비워요"""
+        self._top_row = max(0, self.view.indexAt(QPoint(0, 0)).row())
+        self.model.set_chats([])
+        self.loaded = False
+
+    def ensure_loaded(self):
+        if self.loaded:
+            return
+        self.model.set_chats(self.stored_chats())
+        self.loaded = True
+        if self._top_row < len(self.model.chats):
+            self.view.scrollTo(self.model.index(self._top_row), QListView.PositionAtTop)
+
+    def stored_chats(self):
+        return self.store.search(self.query, [self.video_id], include_partial=True)
+
+    def chats(self):
+        """내보낼 채팅들. 비워둔 탭은 다시 채우지 않고 저장소에서 바로 꺼내요"""
+        return self.model.chats if self.loaded else self.stored_chats()
+
+    def set_status(self, html):
+        self.status_label.setText(html)
+
+    def set_timeline(self, overall, matched, spikes):
+        """분당 채팅 수 띠를 그리고, 채팅이 몰린 구간을 바로가기 링크로 보여줘요"""
+        self.density_strip.set_counts(overall, matched)
+        if spikes:
+            links = " ".join(f'<a href="{url}">{time_text}</a>({count})' for time_text, count, url in spikes)
+            self.spikes_label.setText(f"🔥 채팅 폭발 구간: {links}")
+            self.spikes_label.show()
 
 
 if __name__ == "__main__":
+    # 요청 하나하나까지 보고 싶으면 ANTYS_LOG_LEVEL=DEBUG, 파일로 남기려면 ANTYS_LOG_FILE=경로
+    setup_logging(os.environ.get("ANTYS_LOG_LEVEL", "INFO"), os.environ.get("ANTYS_LOG_FILE"))
     app = QApplication(sys.argv)
     window = ChatFetcherApp()
     window.show()
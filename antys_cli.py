@@ -0,0 +1,347 @@
+"""Antys 명령줄 도구 (PySide6 없이 돌아가요)
+
+    python antys_cli.py list --channel <채널 링크 또는 ID>
+    python antys_cli.py fetch --channel <채널> --nickname X --nickname Y --keyword ㅋㅋ --out results.jsonl
+    python antys_cli.py fetch --channel <채널> --keyword ㅋㅋ --async --workers 20 --out results.jsonl
+    python antys_cli.py search --keyword ㅋㅋㅋ --regex "^ㅋ{5,}$" --out hits.csv
+    python antys_cli.py highlights --top 5
+    python antys_cli.py --archive ~/.antys/archive fetch --channel <채널> --keyword ㅋㅋ --out results.jsonl
+    python antys_cli.py replay --keyword ㄷㄷ --out hits.jsonl        # 보관해둔 응답으로 서버 없이 다시 거르기
+    python antys_cli.py watch --channel <채널> --keyword ㅋㅋㅋ --out matches.jsonl   # 새 다시보기를 계속 받아두기
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from chat_archive import DEFAULT_ARCHIVE_DIR, ArchiveClient, ChatArchive
+from chat_async import AsyncChatCrawler, AsyncChzzkClient, crawl_many, load_channel_vods_async
+from chat_crawler import ChatCrawler, load_channel_vods, search_stored
+from chat_query import QuerySet
+from chat_metrics import format_eta, setup_logging
+from chat_watch import WATCH_BACKFILL, WATCH_INTERVAL, WATCH_REQUESTS_PER_SECOND, ChannelWatcher
+from chat_timeline import SPIKE_COUNT, spike_links, vod_timeline
+from chat_export import EXPORT_FORMATS, chat_row, export_chats, vod_meta
+from chat_store import DEFAULT_DB_PATH, ChatStore
+from chzzk_api import ChzzkApiError, ChzzkClient, RateLimiter, DEFAULT_MAX_WORKERS, DEFAULT_REQUESTS_PER_SECOND, parse_channel_id
+
+log = logging.getLogger("antys")
+
+
+def list_channel_vods(client, store, channel):
+    channel_id = parse_channel_id(channel)
+    if not channel_id:
+        raise SystemExit(f"채널 링크를 알아볼 수 없어요: {channel}")
+
+    return load_channel_vods(client, store, channel_id)
+
+
+def select_vods(vods, video_nos=None, latest=None):
+    if video_nos:
+        wanted = {int(video_no) for video_no in video_nos}
+        vods = [vod for vod in vods if int(vod["videoNo"]) in wanted]
+    if latest:
+        vods = vods[:latest]
+    return vods
+
+
+def build_query(args):
+    try:
+        query = QuerySet(args.nickname, args.keyword, args.regex, args.ignore_case, args.ignore_width)
+    except re.error as e:
+        raise SystemExit(f"정규식 오류: {e}")
+    if query.is_empty():
+        raise SystemExit("--nickname, --keyword, --regex 중 하나는 있어야 해요!")
+    return query
+
+
+def progress_logger(video_id, step=0.1):
+    """진행률이 step 만큼 오를 때마다 남은 시간과 같이 로그를 남겨요"""
+    reported = [0.0]
+
+    def on_progress(fraction, eta):
+        if fraction >= 1.0 or fraction - reported[0] >= step:
+            reported[0] = fraction
+            log.info("[%s] %.0f%% 받았어요 (남은 시간 약 %s)", video_id, fraction * 100, format_eta(eta))
+
+    return on_progress
+
+
+def command_list(args, client, store):
+    for vod in list_channel_vods(client, store, args.channel):
+        status = "저장됨" if store.is_complete(vod["videoNo"]) else ""
+        print(f'{vod["videoNo"]}\t{vod["publishDate"]}\t{vod.get("duration", 0)}s\t{vod["videoTitle"]}\t{status}')
+
+
+def command_fetch(args, client, store):
+    query = build_query(args)
+    archive = ChatArchive(args.archive) if args.archive else None
+    if args.use_async:
+        vods, outcomes = asyncio.run(fetch_async(args, client, store, query, archive))
+        vod_count, chat_count, failures = export_fetched(args, vods, outcomes)
+    else:
+        vods = select_vods(list_channel_vods(client, store, args.channel), args.video, args.latest)
+        if not vods:
+            raise SystemExit("받을 다시보기가 없어요!")
+
+        crawlers = [
+            ChatCrawler(
+                str(vod["videoNo"]), query, store, client, (vod.get("duration") or 0) * 1000,
+                on_progress=progress_logger(str(vod["videoNo"])), archive=archive,
+            )
+            for vod in vods
+        ]
+
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = [pool.submit(crawler.run) for crawler in crawlers]
+            try:
+                vod_count, chat_count, failures = export_fetched(args, vods, (future.result() for future in futures))
+            except KeyboardInterrupt:
+                # 체크포인트는 저장돼 있으니 다음에 같은 명령으로 이어받으면 돼요
+                for crawler in crawlers:
+                    crawler.stop()
+                raise
+
+    print(f"다시보기 {vod_count}개에서 채팅 {chat_count}개를 {args.out} 에 저장했어요!", file=sys.stderr)
+    log.info("수집 통계: %s", client.metrics.summary())
+    if args.metrics:
+        client.metrics.write(args.metrics, vods=vod_count, chats=chat_count, failed=[video_no for video_no, _ in failures])
+    return 1 if failures else 0
+
+
+async def fetch_async(args, client, store, query, archive=None):
+    """목록과 모든 다시보기를 이벤트 루프 하나에서 받고 (다시보기 목록, (채팅, 오류) 목록) 을 돌려줘요"""
+    channel_id = parse_channel_id(args.channel)
+    if not channel_id:
+        raise SystemExit(f"채널 링크를 알아볼 수 없어요: {args.channel}")
+
+    async_client = AsyncChzzkClient(client)
+    try:
+        vods = select_vods(await load_channel_vods_async(async_client, store, channel_id), args.video, args.latest)
+        if not vods:
+            raise SystemExit("받을 다시보기가 없어요!")
+
+        crawlers = [
+            AsyncChatCrawler(
+                str(vod["videoNo"]), query, store, async_client, (vod.get("duration") or 0) * 1000,
+                on_progress=progress_logger(str(vod["videoNo"])), archive=archive,
+            )
+            for vod in vods
+        ]
+        return vods, await crawl_many(crawlers, args.workers)
+    finally:
+        await async_client.close()
+
+
+def export_fetched(args, vods, outcomes):
+    """(채팅, 오류) 들을 다시보기 순서(최신순)대로 파일에 쓰고 (다시보기 수, 채팅 수, 실패 목록) 을 돌려줘요"""
+    failures = []
+
+    def results():
+        for vod, (chats, error_message) in zip(vods, outcomes):
+            if error_message:
+                failures.append((vod["videoNo"], error_message))
+            print(f'[{vod["videoNo"]}] {len(chats)}개 {error_message or ""}', file=sys.stderr)
+            meta = vod_meta(vod["videoNo"], vod["videoTitle"], vod["publishDate"], (vod.get("channel") or {}).get("channelId"))
+            yield meta, chats
+
+    vod_count, chat_count = export_chats(args.out, results(), args.format)
+    return vod_count, chat_count, failures
+
+
+def command_search(args, client, store):
+    query = build_query(args)
+    vod_count, chat_count = export_chats(args.out, search_stored(store, query), args.format)
+    print(f"저장된 다시보기 {vod_count}개에서 채팅 {chat_count}개를 {args.out} 에 저장했어요!", file=sys.stderr)
+
+
+def command_replay(args, client, store):
+    """보관해둔 응답을 서버 대신 디스크에서 다시 훑어서 새 조건으로 걸러요
+
+    --rebuild 면 저장소의 채팅도 보관함에서 처음부터 다시 채워요. 끝까지 보관 안 된 다시보기는 저장소를 안 건드려요.
+    """
+    query = build_query(args)
+    archive = ChatArchive(args.archive or DEFAULT_ARCHIVE_DIR)
+    video_nos = [int(video_no) for video_no in args.video] if args.video else archive.video_nos()
+    if not video_nos:
+        raise SystemExit("보관해둔 다시보기가 없어요!")
+
+    archive_client = ArchiveClient(archive, partial=not args.rebuild)
+    vod_info = {
+        video_no: vod_meta(video_no, title, publish_date, channel_id)
+        for video_no, channel_id, title, publish_date in store.complete_vods()
+    }
+
+    def results():
+        for video_no in video_nos:
+            if not archive_client.is_complete(video_no):
+                if args.rebuild:
+                    print(f"[{video_no}] 끝까지 보관 안 된 다시보기라 저장소는 그대로 둘께요", file=sys.stderr)
+                    continue
+                print(f"[{video_no}] 끝까지 보관 안 된 다시보기라 보관된 데까지만 걸러요", file=sys.stderr)
+            if args.rebuild:
+                store.reset_vod(video_no)
+            crawler = ChatCrawler(str(video_no), query, store if args.rebuild else None, archive_client)
+            chats, error_message = crawler.run()
+            print(f'[{video_no}] {len(chats)}개 {error_message or ""}', file=sys.stderr)
+            yield vod_info.get(video_no) or vod_meta(video_no), chats
+
+    vod_count, chat_count = export_chats(args.out, results(), args.format)
+    print(f"보관해둔 다시보기 {vod_count}개에서 채팅 {chat_count}개를 {args.out} 에 저장했어요!", file=sys.stderr)
+    log.info("다시 읽기 통계: %s", archive_client.metrics.summary())
+
+
+def command_watch(args, client, store):
+    """지켜볼 채널과 검색 조건을 저장하고, 새 다시보기를 받아둘 때마다 찾은 채팅을 찍어요
+
+    한 번 저장한 채널과 조건은 저장소에 남아서 다음에는 그냥 `watch` 만 해도 돼요.
+    `--channel` 과 같이 준 조건은 그 채널에만, 채널 없이 준 조건은 모든 채널에 걸려요.
+    """
+    channel_ids = []
+    for channel in args.channel or []:
+        channel_id = parse_channel_id(channel)
+        if not channel_id:
+            raise SystemExit(f"채널 링크를 알아볼 수 없어요: {channel}")
+        store.watch_channel(channel_id)
+        channel_ids.append(channel_id)
+    for channel in args.forget or []:
+        store.unwatch_channel(parse_channel_id(channel) or channel)
+
+    try:
+        query = QuerySet(args.nickname, args.keyword, args.regex, args.ignore_case, args.ignore_width)
+    except re.error as e:
+        raise SystemExit(f"정규식 오류: {e}")
+    if not query.is_empty():
+        for channel_id in channel_ids or [None]:
+            store.save_query(args.name or query.describe(), query.to_spec(), channel_id)
+
+    if args.list:
+        for channel_id in store.watched_channels():
+            print(f"채널\t{channel_id}")
+        for name, channel_id, spec in store.saved_queries():
+            print(f"조건\t{name}\t{channel_id or '모든 채널'}\t{json.dumps(spec, ensure_ascii=False)}")
+        return 0
+    if not store.watched_channels():
+        raise SystemExit("지켜볼 채널이 없어요! --channel 로 넣어주세요")
+
+    def on_matches(name, meta, chats):
+        for chat in chats:
+            print(f"{name}\t{meta['video_no']}\t{chat.timestamp()}\t{chat.nickname}\t{chat.message}\t{chat.url()}")
+        if args.out:
+            with open(args.out, "a", encoding="utf-8") as file:
+                for chat in chats:
+                    file.write(json.dumps({"query": name, **chat_row(meta, chat)}, ensure_ascii=False) + "\n")
+
+    archive = ChatArchive(args.archive) if args.archive else None
+    watch_client = ChzzkClient(RateLimiter(args.watch_rate))
+    watcher = ChannelWatcher(store, watch_client, args.interval, args.backfill, on_matches, archive=archive)
+    if args.once:
+        print(f"새로 받아둔 다시보기 {watcher.poll()}개", file=sys.stderr)
+        return 0
+
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        watcher.stop()
+        raise
+
+
+def command_highlights(args, client, store):
+    """받아둔 다시보기마다 채팅이 가장 몰린 구간을 바로가기 링크로 찍어요"""
+    vods = store.complete_vods()
+    if args.video:
+        wanted = {int(video_no) for video_no in args.video}
+        vods = [vod for vod in vods if vod[0] in wanted]
+
+    for video_no, _, title, publish_date in vods:
+        timeline = vod_timeline(store, video_no, top_n=args.top)
+        if timeline is None:
+            continue
+        print(f"# {video_no}\t{publish_date or ''}\t{title or ''}")
+        for time_text, count, url in spike_links(video_no, timeline[1]):
+            print(f"{time_text}\t{count}\t{url}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="antys", description="치지직 다시보기 채팅 검색기")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="채팅 캐시 SQLite 파일")
+    parser.add_argument("--rate", type=float, default=DEFAULT_REQUESTS_PER_SECOND, help="초당 요청 수")
+    parser.add_argument("--log-level", default="INFO", help="DEBUG 면 요청 하나하나까지 찍어요")
+    parser.add_argument("--log-file", help="로그를 이 파일에도 남겨요")
+    parser.add_argument("--archive", help=f"받은 응답을 압축해서 보관할 폴더 (replay 기본값: {DEFAULT_ARCHIVE_DIR})")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="채널의 다시보기 목록")
+    list_parser.add_argument("--channel", required=True, help="채널 홈 링크 또는 채널 ID")
+    list_parser.set_defaults(handler=command_list)
+
+    fetch_parser = subparsers.add_parser("fetch", help="다시보기 채팅을 받아서 걸러 저장")
+    fetch_parser.add_argument("--channel", required=True, help="채널 홈 링크 또는 채널 ID")
+    fetch_parser.add_argument("--video", action="append", help="이 videoNo 만 받기 (여러 번 쓸 수 있어요)")
+    fetch_parser.add_argument("--latest", type=int, help="최신 다시보기 N개만 받기")
+    fetch_parser.add_argument("--workers", type=int, default=DEFAULT_MAX_WORKERS, help="동시에 받을 다시보기 수")
+    fetch_parser.add_argument(
+        "--async", dest="use_async", action="store_true",
+        help="스레드 대신 asyncio 이벤트 루프 하나로 받아요 (--workers 는 동시에 받을 다시보기 수)",
+    )
+    fetch_parser.add_argument("--metrics", help="요청/속도 통계를 JSON 한 줄로 덧붙일 파일")
+    fetch_parser.set_defaults(handler=command_fetch)
+
+    highlights_parser = subparsers.add_parser("highlights", help="받아둔 다시보기에서 채팅이 몰린 구간 찾기")
+    highlights_parser.add_argument("--video", action="append", help="이 videoNo 만 (여러 번 쓸 수 있어요)")
+    highlights_parser.add_argument("--top", type=int, default=SPIKE_COUNT, help="다시보기마다 몇 군데")
+    highlights_parser.set_defaults(handler=command_highlights)
+
+    replay_parser = subparsers.add_parser("replay", help="보관해둔 응답에서 다시 거르기 (네트워크 안 씀)")
+    replay_parser.add_argument("--video", action="append", help="이 videoNo 만 (여러 번 쓸 수 있어요)")
+    replay_parser.add_argument("--rebuild", action="store_true", help="저장소의 채팅도 보관함에서 다시 채워요")
+    replay_parser.set_defaults(handler=command_replay)
+
+    watch_parser = subparsers.add_parser("watch", help="지켜보는 채널의 새 다시보기를 계속 받아두고 저장한 조건으로 찾기")
+    watch_parser.add_argument("--channel", action="append", help="지켜볼 채널 추가 (여러 번 쓸 수 있어요)")
+    watch_parser.add_argument("--forget", action="append", help="그만 지켜볼 채널")
+    watch_parser.add_argument("--name", help="이번에 저장할 검색 조건 이름 (기본: 조건 내용). --channel 과 같이 쓰면 그 채널에만 걸려요")
+    watch_parser.add_argument("--interval", type=float, default=WATCH_INTERVAL, help="채널을 다시 훑을 간격 (초)")
+    watch_parser.add_argument("--backfill", type=int, default=WATCH_BACKFILL, help="채널마다 최신 몇 개까지 받아둘지")
+    watch_parser.add_argument("--watch-rate", type=float, default=WATCH_REQUESTS_PER_SECOND, help="지켜보기의 초당 요청 수")
+    watch_parser.add_argument("--once", action="store_true", help="한 번만 훑고 끝내요")
+    watch_parser.add_argument("--list", action="store_true", help="지켜보는 채널과 저장한 조건만 보여줘요")
+    watch_parser.add_argument("--out", help="찾은 채팅을 JSONL 로 덧붙일 파일")
+    watch_parser.set_defaults(handler=command_watch)
+
+    search_parser = subparsers.add_parser("search", help="이미 받아둔 채팅에서만 찾기 (네트워크 안 씀)")
+    search_parser.set_defaults(handler=command_search)
+
+    for sub in (fetch_parser, replay_parser, search_parser, watch_parser):
+        sub.add_argument("--nickname", action="append", default=[], help="정확히 일치하는 닉네임 (여러 번 쓸 수 있어요)")
+        sub.add_argument("--keyword", "--message", action="append", default=[], help="채팅 내용에 들어간 문자열 (여러 번)")
+        sub.add_argument("--regex", action="append", default=[], help="채팅 내용 정규식 (여러 번)")
+        sub.add_argument("--ignore-case", action="store_true", help="대소문자 무시")
+        sub.add_argument("--ignore-width", action="store_true", help="전각/반각 무시 (NFKC)")
+
+    for sub in (fetch_parser, replay_parser, search_parser):
+        sub.add_argument("--out", required=True, help="결과 파일 (.jsonl, .csv, .txt)")
+        sub.add_argument("--format", choices=EXPORT_FORMATS, help="확장자 대신 쓸 형식")
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    setup_logging(args.log_level, args.log_file)
+    store = ChatStore(args.db)
+    client = ChzzkClient(RateLimiter(args.rate))
+    try:
+        return args.handler(args, client, store) or 0
+    except ChzzkApiError as e:
+        print(f"!!! 요청 실패! {e} !!!", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+"""치지직 API 흉내를 내는 로컬 서버 (벤치마크용)
+
+    python bench/mock_chzzk.py --port 8765 --latency 0.05 --throttle-every 50
+    ANTYS_API_BASE=http://127.0.0.1:8765/service/v1 python antys_cli.py list --channel <아무 32자리>
+
+/videos/{id}/chats 와 /channels/{id}/videos 만 흉내 내요. /_stats 는 요청 통계, /_stats/reset 은 통계 초기화예요.
+채팅은 다시보기 길이에 고르게 만든 가짜 채팅이거나, --fixture 로 준 JSONL (videoChats 항목 한 줄에 하나),
+또는 --archive-video 로 고른 보관함 (chat_archive) 의 다시보기예요.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+CHATS_PATH = re.compile(r"^/service/v1/videos/(\d+)/chats$")
+VIDEOS_PATH = re.compile(r"^/service/v1/channels/([a-z0-9]{32})/videos$")
+
+
+class SyntheticChats:
+    """다시보기마다 똑같이 만들어지는 가짜 채팅. 다 만들어두지 않고 번호로 바로 계산해요"""
+
+    def __init__(self, duration_ms, chats_per_minute, users=500):
+        self.duration_ms = duration_ms
+        self.interval_ms = max(1, 60 * 1000 // max(1, chats_per_minute))
+        self.count = duration_ms // self.interval_ms
+        self.profiles = [
+            json.dumps({"nickname": f"시청자{user}", "userIdHash": f"hash{user}", "badge": None}, ensure_ascii=False)
+            for user in range(users)
+        ]
+
+    def chat(self, index):
+        user = index * 7919 % len(self.profiles)
+        laugh = " ㅋㅋㅋ" if index % 5 == 0 else ""
+        return {
+            "playerMessageTime": index * self.interval_ms,
+            "userIdHash": f"hash{user}",
+            "content": f"채팅 {index}{laugh}",
+            "profile": self.profiles[user],
+            "messageStatusType": "NORMAL",
+        }
+
+    def page(self, player_message_time, size):
+        first = -(-player_message_time // self.interval_ms)
+        return [self.chat(index) for index in range(first, min(self.count, first + size))]
+
+
+class RecordedChats:
+    """녹화해둔 videoChats 를 playerMessageTime 순서로 돌려줘요"""
+
+    def __init__(self, chats):
+        self.chats = sorted(chats, key=lambda chat: chat["playerMessageTime"])
+        self.count = len(self.chats)
+        self.duration_ms = self.chats[-1]["playerMessageTime"] if self.chats else 0
+        self._times = [chat["playerMessageTime"] for chat in self.chats]
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding="utf-8") as file:
+            return cls(json.loads(line) for line in file if line.strip())
+
+    @classmethod
+    def from_archive(cls, root, video_no):
+        """antys 가 보관해둔 (chat_archive) 다시보기 하나를 그대로 돌려줘요"""
+        sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from chat_archive import DEFAULT_ARCHIVE_DIR, ChatArchive
+        return cls(ChatArchive(root or DEFAULT_ARCHIVE_DIR).iter_chats(video_no))
+
+    def page(self, player_message_time, size):
+        first = bisect_left(self._times, player_message_time)
+        return self.chats[first:first + size]
+
+
+class MockChzzk:
+    """가짜 서버 설정과 요청 통계"""
+
+    def __init__(self, chats, vod_count=40, page_size=100, latency=0.0, jitter=0.0, throttle_every=0, retry_after=1.0):
+        self.chats = chats
+        self.vod_count = vod_count
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.messages = 0
+        self.bytes_sent = 0
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = self.throttled = self.messages = self.bytes_sent = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "messages": self.messages,
+                "bytes": self.bytes_sent,
+            }
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+            throttle = self.throttle_every and self.requests % self.throttle_every == 0
+            if throttle:
+                self.throttled += 1
+            return throttle
+
+    def count_response(self, body, messages=0):
+        with self._lock:
+            self.bytes_sent += len(body)
+            self.messages += messages
+
+    def videos(self, channel_id, page, size):
+        duration = self.chats.duration_ms // 1000
+        newest = 100000 + self.vod_count
+        data = [
+            {
+                "videoNo": newest - index,
+                "videoId": f"mock{newest - index}",
+                "videoTitle": f"가짜 다시보기 {newest - index}",
+                "publishDate": time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(1700000000 - index * 86400)),
+                "duration": duration,
+                "channel": {"channelId": channel_id},
+            }
+            for index in range(page * size, min(self.vod_count, (page + 1) * size))
+        ]
+        total_pages = -(-self.vod_count // size)
+        return {"code": 200, "content": {"page": page, "size": size, "totalCount": self.vod_count, "totalPages": total_pages, "data": data}}
+
+    def video_chats(self, player_message_time):
+        chats = self.chats.page(player_message_time, self.page_size)
+        next_time = chats[-1]["playerMessageTime"] + 1 if chats else None
+        return {"code": 200, "content": {"nextPlayerMessageTime": next_time, "videoChats": chats}}, len(chats)
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        mock = self.server.mock
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+
+        if url.path.startswith("/_stats"):
+            if url.path == "/_stats/reset":
+                mock.reset_stats()
+            self.send_json(200, mock.stats(), count=False)
+            return
+
+        if mock.latency or mock.jitter:
+            time.sleep(mock.latency + random.uniform(0, mock.jitter))
+
+        if mock.count_request():
+            self.send_json(429, {"code": 429, "message": "Too Many Requests"}, {"Retry-After": str(mock.retry_after)})
+            return
+
+        match = CHATS_PATH.match(url.path)
+        if match:
+            body, messages = mock.video_chats(int(query.get("playerMessageTime", ["0"])[0]))
+            self.send_json(200, body, messages=messages)
+            return
+
+        match = VIDEOS_PATH.match(url.path)
+        if match:
+            page = int(query.get("page", ["0"])[0])
+            size = int(query.get("size", ["18"])[0])
+            self.send_json(200, mock.videos(match.group(1), page, size))
+            return
+
+        self.send_json(404, {"code": 404, "message": "Not Found"})
+
+    def send_json(self, status, payload, headers=None, messages=0, count=True):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        if count:
+            self.server.mock.count_response(body, messages)
+
+
+def start_server(mock, host="127.0.0.1", port=0):
+    """뒤에서 도는 가짜 서버를 띄우고 (서버, API_BASE 주소) 를 돌려줘요"""
+    server = ThreadingHTTPServer((host, port), MockHandler)
+    server.daemon_threads = True
+    server.mock = mock
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/service/v1"
+
+
+def add_mock_arguments(parser):
+    parser.add_argument("--hours", type=float, default=10.0, help="가짜 다시보기 길이 (시간)")
+    parser.add_argument("--chats-per-minute", type=int, default=600, help="분당 가짜 채팅 수")
+    parser.add_argument("--fixture", help="녹화해둔 videoChats JSONL (주면 가짜 채팅 대신 써요)")
+    parser.add_argument("--archive", help="antys 보관함 폴더 (--archive-video 와 같이 써요)")
+    parser.add_argument("--archive-video", type=int, help="보관함에서 이 videoNo 의 채팅을 돌려줘요")
+    parser.add_argument("--vods", type=int, default=40, help="채널의 다시보기 수")
+    parser.add_argument("--page-size", type=int, default=100, help="채팅 페이지 크기")
+    parser.add_argument("--latency", type=float, default=0.0, help="응답마다 기다릴 초")
+    parser.add_argument("--jitter", type=float, default=0.0, help="latency 에 더할 무작위 초")
+    parser.add_argument("--throttle-every", type=int, default=0, help="N번째 요청마다 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="429 의 Retry-After 초")
+
+
+def mock_from_args(args):
+    if args.archive_video:
+        chats = RecordedChats.from_archive(args.archive, args.archive_video)
+    elif args.fixture:
+        chats = RecordedChats.from_file(args.fixture)
+    else:
+        chats = SyntheticChats(int(args.hours * 3600 * 1000), args.chats_per_minute)
+    return MockChzzk(
+        chats, args.vods, args.page_size, args.latency, args.jitter, args.throttle_every, args.retry_after,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="치지직 API 가짜 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="0 이면 빈 포트를 아무거나 써요")
+    add_mock_arguments(parser)
+    args = parser.parse_args(argv)
+
+    server, api_base = start_server(mock_from_args(args), args.host, args.port)
+    print(f"ANTYS_API_BASE={api_base}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+"""가짜 치지직 서버로 수집 속도를 재요 (네이버 서버에는 요청 안 해요)
+
+    python bench/run_bench.py                       # 10시간짜리 다시보기 하나
+    python bench/run_bench.py --latency 0.05 --throttle-every 40 --json before.json
+
+다시보기 목록 받기, ChatCrawler 수집, ChatFetcherThread 의 화면 전달 지연을 차례로 재서
+초당 채팅 수, 초당 요청 수, 최대 메모리, 화면 전달 지연을 보여줘요.
+가짜 서버는 따로 프로세스로 띄워서 서버가 쓰는 CPU 가 측정에 섞이지 않아요.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from urllib.request import urlopen
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import chzzk_api  # noqa: E402
+from chat_crawler import ChatCrawler, load_channel_vods  # noqa: E402
+from chat_query import QuerySet  # noqa: E402
+from chat_store import ChatStore  # noqa: E402
+from mock_chzzk import add_mock_arguments  # noqa: E402
+
+try:
+    import resource
+except ImportError:
+    # 윈도우에는 resource 가 없어서 파이썬 힙만 재요
+    resource = None
+
+BENCH_CHANNEL_ID = "0" * 32
+
+
+def peak_memory_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # 리눅스는 KB, 맥은 바이트예요
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+
+
+def start_mock_server(args):
+    """가짜 서버를 다른 프로세스로 띄우고 (프로세스, API 주소) 를 돌려줘요"""
+    command = [
+        sys.executable, os.path.join(BENCH_DIR, "mock_chzzk.py"), "--port", "0",
+        "--hours", str(args.hours), "--chats-per-minute", str(args.chats_per_minute),
+        "--vods", str(args.vods), "--page-size", str(args.page_size),
+        "--latency", str(args.latency), "--jitter", str(args.jitter),
+        "--throttle-every", str(args.throttle_every), "--retry-after", str(args.retry_after),
+    ]
+    if args.fixture:
+        command += ["--fixture", args.fixture]
+    if args.archive_video:
+        command += ["--archive-video", str(args.archive_video)] + (["--archive", args.archive] if args.archive else [])
+
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    api_base = process.stdout.readline().strip().split("=", 1)[1]
+    return process, api_base
+
+
+def server_stats(api_base, reset=False):
+    root = api_base.rsplit("/service/v1", 1)[0]
+    with urlopen(f"{root}/_stats{'/reset' if reset else ''}") as response:
+        return json.loads(response.read())
+
+
+def measure(api_base, run):
+    """run() 을 돌리고 (결과, 걸린 초, 서버 통계) 를 돌려줘요"""
+    server_stats(api_base, reset=True)
+    started = time.perf_counter()
+    result = run()
+    elapsed = time.perf_counter() - started
+    return result, elapsed, server_stats(api_base)
+
+
+def report(name, elapsed, stats, **extra):
+    row = {
+        "name": name,
+        "seconds": round(elapsed, 3),
+        "requests": stats["requests"],
+        "throttled": stats["throttled"],
+        "messages": stats["messages"],
+        "megabytes": round(stats["bytes"] / 1024 / 1024, 2),
+        "requests_per_second": round(stats["requests"] / elapsed, 1) if elapsed else 0,
+        "messages_per_second": round(stats["messages"] / elapsed) if elapsed else 0,
+        "peak_memory_mb": round(peak_memory_mb(), 1),
+        **extra,
+    }
+    details = ", ".join(f"{key}={value}" for key, value in extra.items())
+    print(
+        f"[{name}] {row['seconds']}초, 요청 {row['requests']}개 ({row['requests_per_second']}/s, 429 {row['throttled']}번), "
+        f"채팅 {row['messages']}개 ({row['messages_per_second']}/s), {row['megabytes']}MB, "
+        f"최대 메모리 {row['peak_memory_mb']}MB" + (f", {details}" if details else "")
+    )
+    return row
+
+
+def bench_listing(api_base, client):
+    vods, elapsed, stats = measure(api_base, lambda: load_channel_vods(client, None, BENCH_CHANNEL_ID))
+    return report("목록", elapsed, stats, vods=len(vods)), vods
+
+
+def bench_crawl(api_base, client, vod, query, db_path):
+    crawler = ChatCrawler(str(vod["videoNo"]), query, ChatStore(db_path), client, vod["duration"] * 1000)
+    (chats, error), elapsed, stats = measure(api_base, crawler.run)
+    return report("수집", elapsed, stats, matched=len(chats), error=error)
+
+
+def bench_ui(api_base, client, vod, query, db_path):
+    """ChatFetcherThread 가 묶음을 만든 순간부터 GUI 스레드 슬롯이 받을 때까지 걸린 시간을 재요"""
+    try:
+        from PySide6.QtCore import QCoreApplication
+        from Antys import ChatFetcherThread
+    except ImportError:
+        print("[화면] PySide6 가 없어서 건너뛰어요")
+        return None
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    thread = ChatFetcherThread(str(vod["videoNo"]), query, ChatStore(db_path), client, vod["duration"] * 1000)
+
+    sent_at = {}
+    latencies = []
+    emit = thread.crawler.on_chats
+
+    def on_chats(chats):
+        sent_at[id(chats[0])] = time.perf_counter()
+        emit(chats)
+
+    def received(chats, video_id):
+        latencies.append(time.perf_counter() - sent_at.pop(id(chats[0]), time.perf_counter()))
+
+    thread.crawler.on_chats = on_chats
+    thread.chat_progress.connect(received)
+    thread.finished.connect(app.quit)
+
+    def run():
+        thread.start()
+        app.exec()
+        thread.wait()
+
+    _, elapsed, stats = measure(api_base, run)
+    latencies.sort()
+    percentile = (lambda p: round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)) if latencies else (lambda p: None)
+    return report("화면", elapsed, stats, batches=len(latencies), ui_p50_ms=percentile(0.5), ui_p95_ms=percentile(0.95))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Antys 수집 벤치마크")
+    add_mock_arguments(parser)
+    parser.add_argument("--rate", type=float, default=1000.0, help="클라이언트 초당 요청 제한")
+    parser.add_argument("--keyword", action="append", default=None, help="찾을 키워드 (기본: ㅋㅋㅋ)")
+    parser.add_argument("--no-ui", action="store_true", help="화면 전달 지연은 안 재요")
+    parser.add_argument("--json", help="결과를 JSON 으로 저장해서 다른 실행과 비교해요")
+    args = parser.parse_args(argv)
+
+    if resource is None:
+        tracemalloc.start()
+
+    process, api_base = start_mock_server(args)
+    chzzk_api.API_BASE = api_base
+    query = QuerySet(keywords=args.keyword or ["ㅋㅋㅋ"])
+    results = []
+
+    try:
+        with tempfile.TemporaryDirectory() as workdir:
+            client = chzzk_api.ChzzkClient(chzzk_api.RateLimiter(args.rate))
+            row, vods = bench_listing(api_base, client)
+            results.append(row)
+
+            results.append(bench_crawl(api_base, client, vods[0], query, os.path.join(workdir, "crawl.db")))
+            if not args.no_ui:
+                row = bench_ui(api_base, client, vods[1 % len(vods)], query, os.path.join(workdir, "ui.db"))
+                if row:
+                    results.append(row)
+    finally:
+        process.terminate()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"args": vars(args), "results": results}, file, ensure_ascii=False, indent=2)
+        print(f"결과를 {args.json} 에 저장했어요!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""다시보기 채팅 API 응답을 받은 그대로 압축해서 쌓아두는 보관함
+
+    ~/.antys/archive/<videoNo>/chats-00000.jsonl.zst   응답 페이지 하나가 압축 프레임 하나
+    ~/.antys/archive/<videoNo>/index.jsonl             프레임마다 (청크, 오프셋, 크기, cursor, 채팅 시간 범위) 한 줄,
+                                                        구간을 끝까지 받으면 (구간 시작, 끝, done) 한 줄
+
+파일은 뒤에 덧붙이기만 해서 받다가 꺼져도 앞에 써둔 건 안 깨져요. 프레임은 하나씩 따로 압축해서
+인덱스만 보고 필요한 페이지만 풀어 읽어요. zstandard 가 있으면 zstd 로 (pip install zstandard), 없으면 gzip 으로 써요.
+보관해둔 다시보기는 ArchiveClient 로 서버 대신 디스크에서 다시 훑어서 새 조건으로 거르거나 저장소를 다시 만들 수 있어요.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+
+try:
+    import zstandard  # 있으면 gzip 보다 작고 빠르게 압축해요 (pip install zstandard)
+except ImportError:
+    zstandard = None
+
+from chat_metrics import CrawlMetrics
+from chzzk_api import ChzzkApiError, json_dumps, json_loads
+
+log = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_DIR = os.path.join(os.path.expanduser("~"), ".antys", "archive")
+ARCHIVE_CHUNK_BYTES = 64 * 1024 * 1024
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+INDEX_NAME = "index.jsonl"
+CHUNK_NAME = re.compile(r"^chats-(\d{5})\.jsonl(\.zst|\.gz)$")
+CHATS_URL_VIDEO = re.compile(r"/videos/(\d+)/chats$")
+
+
+def compress_frame(data):
+    """(확장자, 압축한 바이트) 를 돌려줘요"""
+    if zstandard is not None:
+        return ".zst", zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return ".gz", gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def decompress_frame(chunk_name, data):
+    if chunk_name.endswith(".zst"):
+        if zstandard is None:
+            raise ChzzkApiError(f"{chunk_name} 를 읽으려면 zstandard 가 필요해요 (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class ChatArchive:
+    """다시보기마다 응답 페이지를 압축해서 쌓아요. 여러 수집 스레드가 같이 써도 돼요"""
+
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._chunks = {}  # videoNo -> 지금 덧붙이는 청크 파일 이름
+        self.read_frame = lru_cache(maxsize=16)(self._read_frame)
+
+    def vod_dir(self, video_no):
+        return os.path.join(self.root, str(video_no))
+
+    def video_nos(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            int(name) for name in os.listdir(self.root)
+            if name.isdigit() and os.path.exists(os.path.join(self.root, name, INDEX_NAME))
+        )
+
+    def add_page(self, video_no, range_start, cursor, chat_data):
+        """cursor 로 요청해서 받은 응답 하나를 덧붙여요. 압축은 잠금 밖에서 해요"""
+        video_chats = (chat_data.get("content") or {}).get("videoChats") or []
+        extension, frame = compress_frame(json_dumps(chat_data))
+
+        with self._lock:
+            directory = self.vod_dir(video_no)
+            os.makedirs(directory, exist_ok=True)
+            chunk_name = self._current_chunk(str(video_no), directory, extension)
+
+            with open(os.path.join(directory, chunk_name), "ab") as file:
+                offset = file.tell()
+                file.write(frame)
+                if file.tell() >= ARCHIVE_CHUNK_BYTES:
+                    self._chunks[str(video_no)] = self._chunk_name(chunk_name, 1, extension)
+
+            # 프레임을 다 쓴 다음에 인덱스를 써서, 인덱스가 없는 데이터를 가리키는 일은 없어요
+            entry = {
+                "chunk": chunk_name, "offset": offset, "size": len(frame),
+                "range": range_start, "cursor": cursor, "count": len(video_chats),
+                "first": video_chats[0]["playerMessageTime"] if video_chats else None,
+                "last": video_chats[-1]["playerMessageTime"] if video_chats else None,
+            }
+            with open(os.path.join(directory, INDEX_NAME), "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry) + "\n")
+
+    def finish_range(self, video_no, range_start, range_end):
+        """[range_start, range_end) 구간을 끝까지 받았다고 적어둬요. 마지막 구간은 range_end 가 None 이에요"""
+        with self._lock:
+            directory = self.vod_dir(video_no)
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, INDEX_NAME), "a", encoding="utf-8") as file:
+                file.write(json.dumps({"range": range_start, "end": range_end, "done": True}) + "\n")
+
+    def _current_chunk(self, video_no, directory, extension):
+        chunk_name = self._chunks.get(video_no)
+        if chunk_name is None:
+            existing = sorted(name for name in os.listdir(directory) if CHUNK_NAME.match(name))
+            if not existing:
+                chunk_name = self._chunk_name(None, 0, extension)
+            elif not existing[-1].endswith(extension) or os.path.getsize(os.path.join(directory, existing[-1])) >= ARCHIVE_CHUNK_BYTES:
+                chunk_name = self._chunk_name(existing[-1], 1, extension)
+            else:
+                chunk_name = existing[-1]
+            self._chunks[video_no] = chunk_name
+        return chunk_name
+
+    @staticmethod
+    def _chunk_name(previous, step, extension):
+        number = int(CHUNK_NAME.match(previous).group(1)) + step if previous else 0
+        return f"chats-{number:05d}.jsonl{extension}"
+
+    def index(self, video_no):
+        """인덱스 줄들을 쓴 순서대로 돌려줘요. 쓰다 만 마지막 줄은 건너뛰어요"""
+        path = os.path.join(self.vod_dir(video_no), INDEX_NAME)
+        if not os.path.exists(path):
+            return []
+
+        entries = []
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    log.warning("[보관함] %s 인덱스의 깨진 줄을 건너뛰어요", video_no)
+        return entries
+
+    def _read_frame(self, video_no, chunk_name, offset, size):
+        with open(os.path.join(self.vod_dir(video_no), chunk_name), "rb") as file:
+            file.seek(offset)
+            return json_loads(decompress_frame(chunk_name, file.read(size)))
+
+    def read_page(self, video_no, entry):
+        return self.read_frame(str(video_no), entry["chunk"], entry["offset"], entry["size"])
+
+    def segments(self, video_no):
+        """(겹치지 않는 (시작, 끝, 인덱스 줄) 목록, 영상 끝까지 다 보관됐는지) 를 돌려줘요
+
+        구간별로 받은 페이지는 다음 구간 시작에서 자르고, 같은 cursor 를 두 번 받았으면 나중 것만 써요.
+        끝까지 받은 구간들이 0 부터 영상 끝 (None) 까지 빈틈없이 이어져야 다 보관된 거예요.
+        """
+        entries = {}
+        done = {}
+        for entry in self.index(video_no):
+            if entry.get("done"):
+                done[entry["range"]] = entry["end"]
+            else:
+                entries[(entry["range"], entry["cursor"])] = entry
+
+        ranges = sorted({range_start for range_start, _ in entries})
+        next_range = dict(zip(ranges, ranges[1:] + [None]))
+
+        segments = []
+        covered = None
+        for (range_start, cursor), entry in sorted(entries.items()):
+            if not entry["count"]:
+                continue
+            start = max(cursor, range_start) if covered is None else max(cursor, range_start, covered)
+            end = entry["last"] + 1
+            if next_range[range_start] is not None:
+                end = min(end, next_range[range_start])
+            if start < end:
+                segments.append((start, end, entry))
+                covered = end
+
+        # 받다 만 구간이 있으면 그 뒤는 비어 있을 수 있어요
+        position = 0
+        while position is not None and position in done:
+            position = done[position]
+        return segments, position is None
+
+    def iter_chats(self, video_no):
+        """보관해둔 videoChats 항목을 시간 순서로, 겹친 것 없이 돌려줘요"""
+        for start, end, entry in self.segments(video_no)[0]:
+            for chat in self.read_page(video_no, entry)["content"]["videoChats"]:
+                if start <= chat["playerMessageTime"] < end:
+                    yield chat
+
+
+class ArchiveClient:
+    """ChzzkClient 대신 쓰면 채팅 요청을 서버 대신 보관함에서 돌려줘요
+
+    ChatCrawler 에 그대로 넣으면 같은 코드로 디스크에서 다시 거르거나 저장소를 다시 만들어요.
+    받다 만 다시보기는 보관된 데까지만 돌려주고, 그 뒤를 물으면 ChzzkApiError 를 내서 다 받은 걸로 착각하지 않게 해요.
+    partial 이면 오류 대신 거기서 끝난 걸로 쳐요 (저장소에 안 쓰고 거르기만 할 때).
+    """
+
+    def __init__(self, archive, partial=False):
+        self.archive = archive
+        self.partial = partial
+        self.metrics = CrawlMetrics()
+        self._segments = {}
+        self._lock = threading.Lock()
+
+    def segments(self, video_no):
+        with self._lock:
+            if video_no not in self._segments:
+                segments, complete = self.archive.segments(video_no)
+                self._segments[video_no] = ([start for start, _, _ in segments], segments, complete)
+            return self._segments[video_no]
+
+    def is_complete(self, video_no):
+        return self.segments(str(video_no))[2]
+
+    def get_json(self, url, params=None, headers=None, cancelled=None):
+        match = CHATS_URL_VIDEO.search(url)
+        if match is None:
+            raise ChzzkApiError(f"보관함에는 채팅만 있어요: {url}")
+        if cancelled is not None and cancelled():
+            return None
+
+        video_no = match.group(1)
+        current_time = int((params or {}).get("playerMessageTime", 0))
+        starts, segments, complete = self.segments(video_no)
+
+        # 구간 경계에서 잘린 페이지는 current_time 뒤로 채팅이 없을 수 있어서, 채팅이 나올 때까지 다음 페이지로 넘어가요
+        index = max(0, bisect_right(starts, current_time) - 1)
+        while index < len(segments):
+            start, end, entry = segments[index]
+            start = max(start, current_time)
+            video_chats = [
+                chat for chat in self.archive.read_page(video_no, entry)["content"]["videoChats"]
+                if start <= chat["playerMessageTime"] < end
+            ]
+            if video_chats:
+                return {"content": {"videoChats": video_chats, "nextPlayerMessageTime": end}}
+            index += 1
+        if not complete and not self.partial:
+            raise ChzzkApiError(f"{video_no} 는 {current_time}ms 부터 보관된 게 없어요 (받다 만 다시보기예요)")
+        return {"content": {"videoChats": [], "nextPlayerMessageTime": None}}
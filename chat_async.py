@@ -0,0 +1,377 @@
+"""asyncio 로 여러 다시보기를 한 이벤트 루프에서 같이 받는 수집 엔진
+
+다시보기마다 QThread 와 구간 스레드 풀을 따로 띄우는 대신, 모든 구간 cursor 와 목록 페이지를
+스레드 하나의 이벤트 루프에서 코루틴으로 돌려요. 요청은 aiohttp 로 보내고 (pip install aiohttp),
+aiohttp 가 없으면 기존 requests 클라이언트를 스레드 풀에서 돌려요.
+속도 제한, 재시도, 통계는 ChzzkClient 것을 그대로 같이 써요.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from chat_crawler import CHAT_BATCH_INTERVAL, VOD_PAGE_SIZE, ChatCrawler, RecentMessages
+from chzzk_api import (
+    RETRY_STATUS_CODES, ChzzkApiError, ChzzkClient, backoff_delay, chat_headers, chats_url, json_loads, list_headers,
+    retry_after_seconds, videos_url,
+)
+
+log = logging.getLogger(__name__)
+
+# 이벤트 루프 하나가 동시에 열어둘 연결 수 (실제 요청 속도는 RateLimiter 가 정해요)
+ASYNC_CONNECTION_LIMIT = 64
+
+
+class AsyncChzzkClient:
+    """ChzzkClient 의 asyncio 버전. 속도 제한, 재시도 규칙, 통계는 감싼 ChzzkClient 와 같이 써요"""
+
+    def __init__(self, client=None, connection_limit=ASYNC_CONNECTION_LIMIT):
+        self.client = client or ChzzkClient()
+        self.limiter = self.client.limiter
+        self.metrics = self.client.metrics
+        self.connection_limit = connection_limit
+        self._session = None
+
+    def session(self):
+        # ClientSession 은 이벤트 루프 안에서 만들어야 해서 처음 요청할 때 만들어요
+        if self._session is None or self._session.closed:
+            connect_timeout, read_timeout = self.client.timeout
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connection_limit),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def acquire(self):
+        while True:
+            wait = self.limiter.try_acquire()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    async def get_json(self, url, params=None, headers=None, cancelled=None):
+        """ChzzkClient.get_json 과 똑같이 동작해요. 태스크를 취소하면 기다리던 곳에서 바로 멈춰요"""
+        if aiohttp is None:
+            return await asyncio.to_thread(self.client.get_json, url, params, headers, cancelled)
+
+        for attempt in range(self.client.max_retries + 1):
+            if cancelled is not None and cancelled():
+                return None
+
+            await self.acquire()
+            if cancelled is not None and cancelled():
+                return None
+            started = time.monotonic()
+            try:
+                async with self.session().get(url, params=params, headers=headers) as response:
+                    content = await response.read()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                self.metrics.record_error()
+                if attempt == self.client.max_retries:
+                    raise ChzzkApiError(f"연결 실패: {e!r}") from e
+                self.metrics.record_retry()
+                log.warning("연결 실패, 다시 시도할께요 (%d/%d): %r", attempt + 1, self.client.max_retries, e)
+                await asyncio.sleep(backoff_delay(attempt))
+                continue
+
+            latency = time.monotonic() - started
+            self.metrics.record_request(latency, len(content))
+            log.debug("GET %s %s -> %d (%.0fms)", url, params, response.status, latency * 1000)
+
+            if response.status == 200:
+                self.limiter.on_success(latency)
+                return json_loads(content)
+
+            if response.status not in RETRY_STATUS_CODES or attempt == self.client.max_retries:
+                self.metrics.record_error()
+                raise ChzzkApiError(f"HTTP 상태 코드: {response.status}", response.status)
+
+            if response.status == 429:
+                self.limiter.on_throttle()
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            self.metrics.record_retry(throttled=response.status == 429)
+            log.warning("HTTP 상태 코드: %d, %.1f초 쉬었다가 다시 시도할께요", response.status, delay)
+            await asyncio.sleep(delay)
+
+
+class AsyncChatCrawler(ChatCrawler):
+    """ChatCrawler 와 같은 일을 하지만 구간마다 스레드 대신 코루틴으로 받아요
+
+    구간 수만큼 스레드를 띄우지 않으니까 구간을 전부 동시에 받아요. 동시에 나가는 요청은 RateLimiter 가 정해요.
+    저장소를 읽고 쓰거나 채팅을 거르는 일은 다른 다시보기가 안 멈추게 전부 스레드에서 해요.
+    client 를 안 주면 자기가 만든 AsyncChzzkClient 를 run_async() 가 끝날 때 닫아요.
+    """
+
+    def __init__(
+        self, video_id, query, store=None, client=None, duration_ms=0, on_chats=None, on_progress=None, archive=None,
+    ):
+        self._owns_client = client is None
+        self.async_client = client or AsyncChzzkClient()
+        super().__init__(video_id, query, store, self.async_client.client, duration_ms, on_chats, on_progress, archive)
+
+    async def run_async(self):
+        """run() 과 같이 (찾은 ChatRecord 목록, 오류 메시지 또는 None) 을 돌려줘요"""
+        if not await asyncio.to_thread(self.claims.claim, self.video_id, self, self.is_cancelled):
+            log.info("[%s] 다른 수집이 받는 중이라 기다리다 멈췄어요", self.video_id)
+            return [], None
+        try:
+            return await self.crawl_async()
+        finally:
+            self.claims.release(self.video_id, self)
+            if self._owns_client:
+                await self.async_client.close()
+
+    async def crawl_async(self):
+        if self.store is not None and await asyncio.to_thread(self.store.is_complete, self.video_id):
+            return await asyncio.to_thread(self.filter_from_store)
+
+        filtered_chats = []
+        checkpoints = await asyncio.to_thread(self.start_ranges)
+        range_queues = [asyncio.Queue() for _ in checkpoints]
+        tasks = [
+            asyncio.create_task(self.fetch_range_async(range_start, range_end, cursor, range_queue))
+            for (range_start, range_end, cursor, done), range_queue in zip(checkpoints, range_queues)
+            if not done
+        ]
+
+        try:
+            for (range_start, range_end, cursor, done), range_queue in zip(checkpoints, range_queues):
+                await asyncio.to_thread(self.emit_stored, filtered_chats, range_start, range_end if done else cursor)
+                if done:
+                    continue
+
+                while True:
+                    kind, payload = await range_queue.get()
+                    if kind == "done":
+                        break
+                    if kind == "error":
+                        self._failed = True
+                        return [], f"!!! 요청 실패! {payload} !!!"
+                    await asyncio.to_thread(self.process_page, payload, filtered_chats)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        return await asyncio.to_thread(self.finish_run, filtered_chats)
+
+    async def fetch_range_async(self, range_start, range_end, cursor, out):
+        """fetch_range 의 코루틴 버전. 저장소 쓰기는 이벤트 루프가 안 막히게 스레드에서 해요"""
+        API_URL = chats_url(self.video_id)
+        headers = chat_headers(self.video_id)
+        current_time = cursor
+        seen = RecentMessages()
+
+        try:
+            while self._is_running and not self._failed:
+                params = {"playerMessageTime": str(current_time)}
+                chat_data = await self.async_client.get_json(API_URL, params, headers, cancelled=self.is_cancelled)
+                if chat_data is None:
+                    break
+
+                # 취소돼도 저장하던 페이지는 마저 저장한 다음에 끝나야 claim 을 놓은 뒤에 쓰지 않아요
+                saving = asyncio.ensure_future(asyncio.to_thread(
+                    self.take_page, range_start, range_end, current_time, chat_data, seen,
+                ))
+                try:
+                    rows, current_time = await asyncio.shield(saving)
+                except asyncio.CancelledError:
+                    await asyncio.wait([saving])
+                    raise
+                if rows:
+                    out.put_nowait(("page", rows))
+                if current_time is None:
+                    break
+        except ChzzkApiError as e:
+            log.error("[%s] %s", self.video_id, e)
+            out.put_nowait(("error", str(e)))
+            return
+        except Exception as e:
+            log.exception("[%s] 구간 수집 중 오류", self.video_id)
+            out.put_nowait(("error", repr(e)))
+            return
+
+        out.put_nowait(("done", None))
+
+
+async def load_channel_vods_async(client, store, channel_id, page_size=VOD_PAGE_SIZE):
+    """load_channel_vods 의 코루틴 버전. 처음 보는 채널이면 첫 페이지 다음 나머지 페이지를 한꺼번에 받아요
+
+    목록은 마지막 페이지까지 받은 다음에 한 번에 저장해서, 중간에 끊겨도 받다 만 목록이 남지 않아요.
+    """
+    known = await asyncio.to_thread(store.channel_vods, channel_id) if store is not None else []
+    listed = store is not None and await asyncio.to_thread(store.is_channel_listed, channel_id)
+    newest = int(known[0]["videoNo"]) if known and listed else None
+
+    async def fetch_page(page):
+        params = {"sortType": "LATEST", "pagingType": "PAGE", "page": page, "size": page_size}
+        response_data = await client.get_json(videos_url(channel_id), params, list_headers())
+        return ((response_data or {}).get("content") or {})
+
+    fresh = []
+    content = await fetch_page(0)
+    pages = [content.get("data") or []]
+    if newest is not None:
+        # 새 다시보기는 앞쪽 페이지에만 있으니까 한 페이지씩 보다가 아는 게 나오면 멈춰요
+        page = 1
+        while pages[-1] and all(int(vod["videoNo"]) > newest for vod in pages[-1]):
+            fresh.extend(pages[-1])
+            pages.append((await fetch_page(page)).get("data") or [])
+            page += 1
+        fresh.extend(vod for vod in pages[-1] if int(vod["videoNo"]) > newest)
+    else:
+        total_pages = content.get("totalPages") or 1
+        pages += [page.get("data") or [] for page in await asyncio.gather(*map(fetch_page, range(1, total_pages)))]
+        for page in pages:
+            fresh.extend(page)
+
+    if store is not None:
+        await asyncio.to_thread(store.save_vod_meta, channel_id, fresh)
+        await asyncio.to_thread(store.set_channel_listed, channel_id, True)
+
+    vods = {int(vod["videoNo"]): vod for vod in known}
+    vods.update((int(vod["videoNo"]), vod) for vod in fresh)
+    return [vods[video_no] for video_no in sorted(vods, reverse=True)]
+
+
+async def crawl_many(crawlers, concurrency):
+    """AsyncChatCrawler 들을 한 번에 concurrency 개씩 돌려서 crawlers 순서대로 결과를 돌려줘요"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(crawler):
+        async with semaphore:
+            return await crawler.run_async()
+
+    return await asyncio.gather(*map(run, crawlers))
+
+
+class AsyncFetchEngine:
+    """이벤트 루프 하나를 자기 스레드에서 돌리면서 submit() 으로 받은 다시보기들을 같이 수집해요
+
+    찾은 채팅, 진행 상황, 끝남은 이벤트로 모아두었다가 CHAT_BATCH_INTERVAL 마다 한 목록으로
+    on_events(이벤트 목록) 에 넘겨줘요 (루프 스레드에서 불러요). 이벤트는 이런 모양이에요.
+
+        ("chats", video_id, ChatRecord 목록)
+        ("progress", video_id, 받은 비율, 남은 초 또는 None)
+        ("finished", video_id, 찾은 ChatRecord 목록, 오류 메시지 또는 None)
+
+    stop() 은 모든 태스크를 취소하고 루프가 끝날 때까지 기다려요.
+    """
+
+    def __init__(self, client=None, store=None, on_events=None, archive=None):
+        self.client = AsyncChzzkClient(client)
+        self.store = store
+        self.archive = archive
+        self.on_events = on_events
+        self._events = []
+        self._events_lock = threading.Lock()
+        self._crawlers = {}
+        self._tasks = set()
+        self._loop = None
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name="antys-async", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._loop.call_soon(ready.set)
+        self._loop.create_task(self._deliver_events())
+        self._loop.run_forever()
+        self._loop.close()
+
+    def is_running(self, video_id):
+        return video_id in self._crawlers
+
+    def submit(self, video_id, query, duration_ms=0):
+        """다시보기 하나를 수집 목록에 넣어요. 아무 스레드에서나 불러도 돼요
+
+        이미 받고 있는 다시보기면 새로 넣지 않고 False 를 돌려줘요.
+        """
+        if self.is_running(video_id):
+            log.warning("[%s] 이미 받고 있는 다시보기예요", video_id)
+            return False
+        self.start()
+        crawler = AsyncChatCrawler(
+            video_id, query, self.store, self.client, duration_ms,
+            on_chats=lambda chats: self._post(("chats", video_id, chats)),
+            on_progress=lambda fraction, eta: self._post(("progress", video_id, fraction, eta)),
+            archive=self.archive,
+        )
+        self._crawlers[video_id] = crawler
+        self._loop.call_soon_threadsafe(self._start_crawler, crawler)
+        return True
+
+    def _start_crawler(self, crawler):
+        task = self._loop.create_task(self._crawl(crawler))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _crawl(self, crawler):
+        try:
+            chats, error = await crawler.run_async()
+        except asyncio.CancelledError:
+            chats, error = [], None
+        except Exception as e:
+            log.exception("[%s] 수집 중 오류", crawler.video_id)
+            chats, error = [], repr(e)
+        self._crawlers.pop(crawler.video_id, None)
+        self._post(("finished", crawler.video_id, chats, error))
+
+    def _post(self, event):
+        with self._events_lock:
+            self._events.append(event)
+
+    def _take_events(self):
+        with self._events_lock:
+            events, self._events = self._events, []
+        return events
+
+    async def _deliver_events(self):
+        try:
+            while True:
+                await asyncio.sleep(CHAT_BATCH_INTERVAL)
+                events = self._take_events()
+                if events and self.on_events is not None:
+                    self.on_events(events)
+        except asyncio.CancelledError:
+            pass
+
+    async def _shutdown(self):
+        for crawler in list(self._crawlers.values()):
+            crawler.stop()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.client.close()
+
+    def stop(self, timeout=10):
+        """수집 중인 걸 모두 취소하고 루프 스레드를 끝내요. 못 보낸 이벤트는 버려요"""
+        if self._thread is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        except Exception:
+            log.exception("비동기 엔진 종료 중 오류")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
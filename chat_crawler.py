@@ -0,0 +1,530 @@
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from chat_export import vod_meta
+from chat_records import ChatRecord
+from chzzk_api import (
+    ChzzkApiError, ChzzkClient, SHARD_WORKERS, chats_url, chat_headers, json_loads, list_headers, split_time_ranges, videos_url,
+)
+
+log = logging.getLogger(__name__)
+
+CHAT_BATCH_SIZE = 200
+CHAT_BATCH_INTERVAL = 0.1
+PROGRESS_INTERVAL = 0.5
+
+VOD_PAGE_SIZE = 18
+VOD_LIST_WORKERS = 4
+
+# 페이지 경계에서 겹쳐 오는 채팅은 cursor 근처에서만 생기니까 이만큼만 기억해요
+DEDUPE_WINDOW_MS = 10 * 1000
+
+# 한 다시보기에 채팅 치는 사람은 많아야 몇천 명이라 이 정도면 거의 다 캐시에서 꺼내요
+PROFILE_CACHE_SIZE = 4096
+
+# 다른 수집기가 같은 다시보기를 받고 있으면 이 간격으로 멈췄는지 확인하면서 기다려요
+CLAIM_POLL_INTERVAL = 0.2
+
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def profile_nickname(profile_str):
+    """profile JSON 문자열에서 닉네임을 꺼내요
+
+    같은 사람은 같은 profile 문자열을 계속 보내니까 문자열 그대로 캐시해서 한 번만 파싱해요.
+    깨진 profile 도 캐시되니까 경고는 문자열마다 한 번만 찍혀요.
+    """
+    if not profile_str:
+        return "Unknown"
+    try:
+        profile_data = json_loads(profile_str)
+    except ValueError:
+        log.warning("[파싱 실패] profile_str: %s", profile_str)
+        return "Unknown"
+    if not isinstance(profile_data, dict):
+        log.warning("[무시됨] profile_str가 dict가 아님: %s", profile_str)
+        return "Unknown"
+    return profile_data.get("nickname", "Unknown")
+
+
+class RecentMessages:
+    """최근 DEDUPE_WINDOW_MS 동안의 채팅만 기억하는 중복 검사기
+
+    채팅은 (시간, userIdHash, 내용 해시) 로 구분해서 같은 밀리초에 온 다른 채팅은 안 버려요.
+    채팅이 playerMessageTime 순서로 오니까 창 밖으로 밀려난 건 잊어버려서, 긴 다시보기도 메모리가 일정해요.
+    """
+
+    def __init__(self, window_ms=DEDUPE_WINDOW_MS):
+        self.window_ms = window_ms
+        self._keys = set()
+        self._order = deque()
+
+    def add(self, time_ms, user_id_hash, message):
+        """처음 보는 채팅이면 기억하고 True, 이미 본 채팅이면 False"""
+        key = (time_ms, user_id_hash, hash(message))
+        if key in self._keys:
+            return False
+
+        self._keys.add(key)
+        self._order.append(key)
+        oldest = time_ms - self.window_ms
+        while self._order[0][0] < oldest:
+            self._keys.discard(self._order.popleft())
+        return True
+
+
+class VodClaims:
+    """다시보기마다 한 번에 한 수집기만 서버에서 받게 해요
+
+    두 수집기가 같은 체크포인트에서 같이 이어받으면 같은 페이지를 두 번 저장하니까,
+    ChatCrawler 는 받기 전에 claim() 하고 다 받거나 멈추면 release() 해요.
+    """
+
+    def __init__(self):
+        self._owners = {}
+        self._changed = threading.Condition()
+
+    def claim(self, video_id, owner, cancelled=None):
+        """다른 수집기가 놓을 때까지 기다렸다가 가져와요. 기다리다 cancelled() 가 참이 되면 False"""
+        video_id = str(video_id)
+        with self._changed:
+            while self._owners.get(video_id, owner) is not owner:
+                if cancelled is not None and cancelled():
+                    return False
+                self._changed.wait(CLAIM_POLL_INTERVAL)
+            self._owners[video_id] = owner
+            return True
+
+    def release(self, video_id, owner):
+        with self._changed:
+            if self._owners.get(str(video_id)) is owner:
+                del self._owners[str(video_id)]
+                self._changed.notify_all()
+
+    def owner(self, video_id):
+        with self._changed:
+            return self._owners.get(str(video_id))
+
+
+# 사람이 누른 수집, 지켜보기, 미리 받기가 모두 이걸 같이 써서 한 프로세스 안에서는 같은 다시보기를 겹쳐 받지 않아요
+vod_claims = VodClaims()
+
+
+class ChatCrawler:
+    """다시보기 하나의 채팅을 모두 한 번만 훑으면서 QuerySet 의 모든 조건에 맞는 채팅을 찾아요
+
+    Qt 없이도 돌아가서 GUI 스레드, 명령줄 도구 어디서든 같은 코드로 수집해요.
+    찾은 채팅은 모아뒀다가 on_chats(ChatRecord 목록) 으로 조금씩 넘겨줘요.
+    다시보기 길이를 알면 on_progress(받은 비율, 남은 초 또는 None) 로 진행 상황도 알려줘요.
+    archive (ChatArchive) 를 주면 받은 응답 페이지를 거르기 전에 그대로 보관해둬요.
+    같은 다시보기를 다른 수집기가 받고 있으면 (claims) 그게 멈추거나 끝날 때까지 기다렸다가 이어받아요.
+    """
+
+    def __init__(
+        self, video_id, query, store=None, client=None, duration_ms=0, on_chats=None, on_progress=None, archive=None,
+        claims=None,
+    ):
+        self.video_id = video_id
+        self.claims = vod_claims if claims is None else claims
+        self.duration_ms = duration_ms
+        self.store = store
+        self.archive = archive
+        self.client = client or ChzzkClient()
+        self.on_chats = on_chats
+        self.on_progress = on_progress
+        self.seen_messages = RecentMessages()
+        self.query = query
+        self._is_running = True
+        self._failed = False
+        self._pending_chats = []
+        self._last_flush = time.monotonic()
+        self._positions = {}  # 구간 시작 -> (구간 끝, 어디까지 받았는지)
+        self._positions_lock = threading.Lock()
+        self._started = None
+        self._start_progress = 0.0
+        self._last_progress = 0.0
+
+    def stop(self):
+        self._is_running = False
+
+    def is_cancelled(self):
+        return not self._is_running or self._failed
+
+    def run(self):
+        """수집을 끝까지 돌리고 (찾은 ChatRecord 목록, 오류 메시지 또는 None) 을 돌려줘요"""
+        if not self.claims.claim(self.video_id, self, self.is_cancelled):
+            log.info("[%s] 다른 수집이 받는 중이라 기다리다 멈췄어요", self.video_id)
+            return [], None
+        try:
+            return self.crawl()
+        finally:
+            self.claims.release(self.video_id, self)
+
+    def crawl(self):
+        if self.store is not None and self.store.is_complete(self.video_id):
+            return self.filter_from_store()
+
+        filtered_chats = []
+
+        # 긴 다시보기는 playerMessageTime 구간으로 나눠서 동시에 받고, 받은 건 구간 순서대로 이어붙여요
+        checkpoints = self.start_ranges()
+        range_queues = [queue.Queue() for _ in checkpoints]
+        pending = [
+            (checkpoint, range_queue)
+            for checkpoint, range_queue in zip(checkpoints, range_queues)
+            if not checkpoint[3]
+        ]
+
+        with ThreadPoolExecutor(max_workers=max(1, min(SHARD_WORKERS, len(pending)))) as pool:
+            for (range_start, range_end, cursor, _), range_queue in pending:
+                pool.submit(self.fetch_range, range_start, range_end, cursor, range_queue)
+
+            for (range_start, range_end, cursor, done), range_queue in zip(checkpoints, range_queues):
+                # 지난번에 받아둔 부분은 저장소에서 먼저 꺼내 보여줘요
+                self.emit_stored(filtered_chats, range_start, range_end if done else cursor)
+                if done:
+                    continue
+
+                while True:
+                    kind, payload = range_queue.get()
+                    if kind == "done":
+                        break
+                    if kind == "error":
+                        self._failed = True
+                        return [], f"!!! 요청 실패! {payload} !!!"
+                    self.process_page(payload, filtered_chats)
+
+        return self.finish_run(filtered_chats)
+
+    def start_ranges(self):
+        """체크포인트를 읽어서 구간별 진행 위치를 잡아두고 체크포인트 목록을 돌려줘요"""
+        log.info("[%s] 채팅 수집 시작!", self.video_id)
+        checkpoints = self.load_checkpoints()
+        for range_start, range_end, cursor, done in checkpoints:
+            self._positions[range_start] = (range_end, range_end if done else cursor)
+        self._started = time.monotonic()
+        self._start_progress = self.progress() or 0.0
+        return checkpoints
+
+    def finish_run(self, filtered_chats):
+        if self._is_running and self.store is not None:
+            self.store.mark_complete(self.video_id)
+
+        self.flush_chats()
+        if self._is_running:
+            self.report_progress(force=True)
+        log.info("[%s] 총 수집된 채팅 수는... %d", self.video_id, len(filtered_chats))
+        return filtered_chats, None
+
+    def progress(self):
+        """다시보기 길이 중 받은 비율 (0~1). 길이를 모르면 None
+
+        구간마다 (구간 끝, 받은 위치) 를 보고 더해요. 위치가 None 이면 그 구간은 다 받은 거예요.
+        """
+        if not self.duration_ms:
+            return None
+
+        covered = 0
+        with self._positions_lock:
+            positions = list(self._positions.items())
+        for range_start, (range_end, position) in positions:
+            end = self.duration_ms if range_end is None else range_end
+            position = end if position is None else min(position, end)
+            covered += max(0, position - range_start)
+        return min(1.0, covered / self.duration_ms)
+
+    def report_progress(self, force=False):
+        """PROGRESS_INTERVAL 초마다 on_progress(비율, 남은 초) 를 불러요"""
+        now = time.monotonic()
+        if self.on_progress is None or (not force and now - self._last_progress < PROGRESS_INTERVAL):
+            return
+        self._last_progress = now
+
+        fraction = self.progress()
+        if fraction is None:
+            return
+
+        # 이번에 받은 만큼의 속도로 남은 부분을 나눠요 (이어받기면 이미 받아둔 부분은 빼요)
+        done = fraction - self._start_progress
+        elapsed = now - self._started
+        eta = elapsed * (1 - fraction) / done if done > 0 and elapsed > 0 else None
+        self.on_progress(fraction, eta)
+
+    def load_checkpoints(self):
+        """(구간 시작, 구간 끝, 다음에 요청할 playerMessageTime, 끝났는지) 목록을 돌려줘요
+
+        이전에 받다 만 다시보기면 저장된 체크포인트에서 이어서 받아요.
+        """
+        if self.store is None:
+            return [(start, end, start, False) for start, end in split_time_ranges(self.duration_ms)]
+
+        checkpoints = self.store.checkpoints(self.video_id)
+        if checkpoints:
+            log.info("[이어받기] %s 는 지난번에 받던 곳부터 이어서 받을께요!", self.video_id)
+            return checkpoints
+
+        return self.store.start_checkpoints(self.video_id, split_time_ranges(self.duration_ms))
+
+    def fetch_range(self, range_start, range_end, cursor, out):
+        """[range_start, range_end) 구간의 채팅을 cursor 부터 받아서 out 큐에 차례로 넣어요
+
+        구간 밖의 채팅은 옆 구간 몫이라 버려요. 그래서 구간 경계에서 같은 채팅이 두 번 들어가지 않아요.
+        받은 페이지는 다음 cursor 와 같이 저장해서, 중간에 끊겨도 거기서부터 이어받을 수 있어요.
+        """
+        API_URL = chats_url(self.video_id)
+        headers = chat_headers(self.video_id)
+        current_time = cursor
+        seen = RecentMessages()
+
+        try:
+            while self._is_running and not self._failed:
+                params = {"playerMessageTime": str(current_time)}
+                chat_data = self.client.get_json(API_URL, params, headers, cancelled=self.is_cancelled)
+                if chat_data is None:
+                    break
+
+                rows, current_time = self.take_page(range_start, range_end, current_time, chat_data, seen)
+                if rows:
+                    out.put(("page", rows))
+                if current_time is None:
+                    break
+        except ChzzkApiError as e:
+            log.error("[%s] %s", self.video_id, e)
+            out.put(("error", str(e)))
+            return
+        except Exception as e:
+            # 워커 스레드에서 난 예외는 그냥 묻히니까, 구간을 다 받은 걸로 착각하지 않게 오류로 넘겨요
+            log.exception("[%s] 구간 수집 중 오류", self.video_id)
+            out.put(("error", repr(e)))
+            return
+        finally:
+            out.put(("done", None))
+
+    def take_page(self, range_start, range_end, current_time, chat_data, seen):
+        """받은 페이지를 저장하고 (이 구간 몫의 rows, 다음에 요청할 cursor) 를 돌려줘요
+
+        구간을 다 받았으면 다음 cursor 는 None 이에요. 스레드로 받든 asyncio 로 받든 이걸 같이 써요.
+        """
+        if self.archive is not None:
+            self.archive.add_page(self.video_id, range_start, current_time, chat_data)
+
+        video_chats = chat_data.get("content", {}).get("videoChats", [])
+        self.client.metrics.record_page(len(video_chats))
+
+        if not video_chats:
+            log.debug("[%s] %s~ 구간은 더 이상 가져올 채팅이 없네요!", self.video_id, range_start)
+            self.finish_range(range_start)
+            return [], None
+
+        rows = self.parse_chats(
+            chat for chat in video_chats
+            if chat["playerMessageTime"] >= range_start
+            and (range_end is None or chat["playerMessageTime"] < range_end)
+            and seen.add(chat["playerMessageTime"], chat.get("userIdHash"), chat.get("content", ""))
+        )
+
+        last_time = video_chats[-1]["playerMessageTime"]
+        if last_time < current_time and not rows:
+            # 이미 본 채팅만 또 오면 cursor 가 제자리라 여기서 끝내요
+            self.finish_range(range_start)
+            return [], None
+        current_time = last_time + 1
+        with self._positions_lock:
+            self._positions[range_start] = (range_end, current_time)
+
+        if self.store is not None:
+            self.store.add_chats(self.video_id, rows, range_start, current_time)
+
+        if range_end is not None and last_time >= range_end:
+            self.finish_range(range_start)
+            return rows, None
+        return rows, current_time
+
+    def finish_range(self, range_start):
+        # 끝까지 받은 구간은 위치를 구간 끝으로 (마지막 구간은 None 이라 영상 끝으로) 쳐요
+        with self._positions_lock:
+            range_end, _ = self._positions.get(range_start, (None, None))
+            self._positions[range_start] = (range_end, range_end)
+        if self.store is not None:
+            self.store.finish_range(self.video_id, range_start)
+        if self.archive is not None:
+            self.archive.finish_range(self.video_id, range_start, range_end)
+
+    def parse_chats(self, video_chats):
+        """API 채팅을 저장소에 넣을 (시간, userIdHash, 닉네임, 내용, profile) 튜플로 바꿔요"""
+        return [
+            (
+                chat.get("playerMessageTime", 0), chat.get("userIdHash"),
+                profile_nickname(chat.get("profile")), chat.get("content", ""), chat.get("profile"),
+            )
+            for chat in video_chats
+        ]
+
+    def process_page(self, rows, filtered_chats):
+        for message_time, user_id_hash, chat_nickname, message, _ in rows:
+            if not self._is_running:
+                break
+
+            matched = self.query.match(chat_nickname, message)
+            if matched:
+                self.emit_chat(filtered_chats, ChatRecord(self.video_id, message_time, chat_nickname, message, user_id_hash, matched))
+
+        # 페이지 사이에는 네트워크를 기다리니까 모아둔 건 바로 보내줘요
+        self.flush_chats()
+        self.report_progress()
+
+    def emit_chat(self, filtered_chats, chat):
+        """찾은 채팅은 모아뒀다가 CHAT_BATCH_SIZE 개나 CHAT_BATCH_INTERVAL 초마다 한 번에 보내요"""
+        if not self.seen_messages.add(chat.time_ms, chat.user_id_hash, chat.message):
+            return
+
+        filtered_chats.append(chat)
+
+        self._pending_chats.append(chat)
+        if (len(self._pending_chats) >= CHAT_BATCH_SIZE
+                or time.monotonic() - self._last_flush >= CHAT_BATCH_INTERVAL):
+            self.flush_chats()
+
+    def flush_chats(self):
+        if self._pending_chats:
+            if self.on_chats is not None:
+                self.on_chats(self._pending_chats)
+            self._pending_chats = []
+        self._last_flush = time.monotonic()
+
+    def emit_stored(self, filtered_chats, start_time=None, end_time=None):
+        if self.store is None:
+            return
+
+        results = self.store.search(
+            self.query, [self.video_id],
+            include_partial=True, start_time=start_time, end_time=end_time,
+        )
+        for chat in results:
+            if not self._is_running:
+                break
+            self.emit_chat(filtered_chats, chat)
+
+    def filter_from_store(self):
+        """이미 다 받아둔 다시보기는 서버에 안 가고 로컬 캐시에서 바로 걸러요"""
+        log.info("[캐시] %s 는 이미 저장돼 있어서 로컬에서 찾을께요!", self.video_id)
+        filtered_chats = []
+
+        self.emit_stored(filtered_chats)
+
+        self.flush_chats()
+        log.info("[%s] 총 수집된 채팅 수는... %d", self.video_id, len(filtered_chats))
+        return filtered_chats, None
+
+
+def iter_vods(client, channel_id, page_size=VOD_PAGE_SIZE, workers=1, cancelled=None):
+    """채널의 다시보기를 최신순으로 한 페이지씩 돌려줘요
+
+    workers 가 2 이상이면 첫 페이지의 totalPages 를 보고 나머지 페이지를 동시에 받아요.
+    받는 건 동시에 해도 돌려주는 건 항상 페이지 순서대로예요.
+    """
+    def fetch_page(page):
+        params = {"sortType": "LATEST", "pagingType": "PAGE", "page": page, "size": page_size}
+        response_data = client.get_json(videos_url(channel_id), params, list_headers(), cancelled)
+        if response_data is None:
+            return None
+        return response_data.get("content") or {}
+
+    content = fetch_page(0)
+    if not content or not content.get("data"):
+        return
+    yield content["data"]
+
+    total_pages = content.get("totalPages")
+    if workers > 1 and total_pages:
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = [pool.submit(fetch_page, page) for page in range(1, total_pages)]
+            for future in futures:
+                content = future.result()
+                if not content or not content.get("data"):
+                    return
+                yield content["data"]
+        finally:
+            # 중간에 그만 받으면 아직 안 보낸 페이지 요청은 취소해요
+            pool.shutdown(wait=False, cancel_futures=True)
+        return
+
+    page = 1
+    while True:
+        content = fetch_page(page)
+        if not content or not content.get("data"):
+            return
+        yield content["data"]
+        page += 1
+
+
+def load_channel_vods(client, store, channel_id, on_vods=None, cancelled=None):
+    """채널의 다시보기 목록을 최신순으로 돌려줘요
+
+    저장소에 받아둔 목록이 있으면 그걸 바로 on_vods 로 넘기고, 서버에서는 그보다 새 다시보기만 받아와요.
+    처음 보는 채널이거나 지난번 목록을 받다 말았으면 모든 페이지를 동시에 받아서 도착하는 대로 넘겨줘요.
+    """
+    known = store.channel_vods(channel_id) if store is not None else []
+    if known and on_vods is not None:
+        on_vods(known)
+
+    # 받다 만 목록에서 가장 최신 것만 보고 멈추면 그 뒤 다시보기는 영영 안 받아져서, 끝까지 받은 적이 있을 때만 이어받아요
+    listed = store is not None and store.is_channel_listed(channel_id)
+    newest = int(known[0]["videoNo"]) if known and listed else None
+    fresh = []
+
+    # 새 다시보기는 앞쪽 페이지에만 있으니까 이어받을 때는 한 페이지씩 보다가 아는 게 나오면 멈춰요
+    pages = iter_vods(client, channel_id, workers=1 if newest else VOD_LIST_WORKERS, cancelled=cancelled)
+    for page in pages:
+        new_vods = [vod for vod in page if newest is None or int(vod["videoNo"]) > newest]
+        if store is not None and new_vods:
+            if listed:
+                # 여기서 끊기면 받아둔 것과 새 것 사이가 비니까, 다 받을 때까지는 안 끝난 걸로 해둬요
+                store.set_channel_listed(channel_id, False)
+                listed = False
+            store.save_vod_meta(channel_id, new_vods)
+        if new_vods and on_vods is not None:
+            on_vods(new_vods)
+        fresh.extend(new_vods)
+
+        if len(new_vods) < len(page):
+            pages.close()
+            break
+
+    if store is not None and not (cancelled is not None and cancelled()):
+        store.set_channel_listed(channel_id, True)
+
+    vods = {int(vod["videoNo"]): vod for vod in known}
+    vods.update((int(vod["videoNo"]), vod) for vod in fresh)
+    return [vods[video_no] for video_no in sorted(vods, reverse=True)]
+
+
+def search_stored(store, query, is_running=None):
+    """저장소 색인으로 찾은 채팅을 (다시보기 정보, ChatRecord 목록) 으로 다시보기마다 묶어 돌려줘요"""
+    vod_info = {
+        video_no: vod_meta(video_no, title, publish_date, channel_id)
+        for video_no, channel_id, title, publish_date in store.complete_vods()
+    }
+
+    current_video = None
+    chats = []
+
+    for chat in store.search(query):
+        if is_running is not None and not is_running():
+            return
+
+        if chat.video_no != current_video:
+            if chats:
+                yield vod_info.get(current_video) or vod_meta(current_video), chats
+            current_video = chat.video_no
+            chats = []
+
+        chats.append(chat)
+
+    if chats:
+        yield vod_info.get(current_video) or vod_meta(current_video), chats
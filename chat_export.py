@@ -0,0 +1,129 @@
+import csv
+import json
+import os
+
+from chat_records import video_time_url, vod_tab_title
+
+EXPORT_FORMATS = ("txt", "jsonl", "csv")
+
+EXPORT_FILE_FILTERS = {
+    "Text Files (*.txt)": "txt",
+    "JSON Lines (*.jsonl)": "jsonl",
+    "CSV (*.csv)": "csv",
+}
+
+EXPORT_FILE_FILTER = ";;".join(EXPORT_FILE_FILTERS) + ";;All Files (*)"
+
+CSV_COLUMNS = (
+    "video_no", "video_title", "publish_date", "channel_id",
+    "time_ms", "timestamp", "nickname", "user_id_hash", "message", "url", "matched",
+)
+
+
+def vod_meta(video_no, title=None, publish_date=None, channel_id=None):
+    return {
+        "video_no": int(video_no),
+        "video_title": title,
+        "publish_date": publish_date,
+        "channel_id": channel_id,
+    }
+
+
+def guess_format(path, default="txt"):
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension == "json":
+        return "jsonl"
+    return extension if extension in EXPORT_FORMATS else default
+
+
+def chat_row(meta, chat):
+    return {
+        **meta,
+        "time_ms": chat.time_ms,
+        "timestamp": chat.timestamp(),
+        "nickname": chat.nickname,
+        "user_id_hash": chat.user_id_hash,
+        "message": chat.message,
+        "url": chat.url(),
+        "matched": list(chat.matched),
+    }
+
+
+def export_chats(path, groups, fmt=None):
+    """(다시보기 정보, ChatRecord 들) 묶음을 한 줄씩 바로 파일에 써요
+
+    채팅을 한꺼번에 문자열로 만들지 않아서 몇백만 줄이어도 메모리를 거의 안 써요.
+    fmt 를 안 주면 확장자로 정해요. (다시보기 수, 채팅 수) 를 돌려줘요.
+    """
+    fmt = fmt or guess_format(path)
+    writer = {"txt": _write_text, "jsonl": _write_jsonl, "csv": _write_csv}[fmt]
+
+    # 엑셀에서 한글이 안 깨지게 CSV 는 BOM 을 붙여요
+    encoding = "utf-8-sig" if fmt == "csv" else "utf-8"
+    with open(path, "w", encoding=encoding, newline="") as file:
+        return writer(file, groups)
+
+
+def _write_text(file, groups):
+    vod_count = 0
+    chat_count = 0
+
+    for meta, chats in groups:
+        title = vod_tab_title(meta["video_no"], meta.get("video_title"), meta.get("publish_date"))
+        file.write(f"===== {title} =====\n")
+        file.write(f"{video_time_url(meta['video_no'])}\n")
+
+        sized = hasattr(chats, "__len__")
+        if sized:
+            file.write(f"총 채팅 수: {len(chats)}개\n\n")
+
+        count = 0
+        for chat in chats:
+            file.write(chat.plain_text() + "\n")
+            count += 1
+
+        if not sized:
+            file.write(f"\n총 채팅 수: {count}개\n")
+
+        file.write("\n\n")
+        vod_count += 1
+        chat_count += count
+
+    return vod_count, chat_count
+
+
+def _write_jsonl(file, groups):
+    vod_count = 0
+    chat_count = 0
+
+    for meta, chats in groups:
+        meta = _export_meta(meta)
+        for chat in chats:
+            file.write(json.dumps(chat_row(meta, chat), ensure_ascii=False) + "\n")
+            chat_count += 1
+        vod_count += 1
+
+    return vod_count, chat_count
+
+
+def _write_csv(file, groups):
+    writer = csv.DictWriter(file, fieldnames=CSV_COLUMNS)
+    writer.writeheader()
+    vod_count = 0
+    chat_count = 0
+
+    for meta, chats in groups:
+        meta = _export_meta(meta)
+        for chat in chats:
+            row = chat_row(meta, chat)
+            row["matched"] = "|".join(row["matched"])
+            writer.writerow(row)
+            chat_count += 1
+        vod_count += 1
+
+    return vod_count, chat_count
+
+
+def _export_meta(meta):
+    return {key: meta.get(key) for key in ("video_no", "video_title", "publish_date", "channel_id")}
+
@@ -0,0 +1,111 @@
+import json
+import logging
+import os
+import threading
+import time
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+
+def setup_logging(level="INFO", path=None):
+    """콘솔로, path 를 주면 파일로도 로그를 보내요
+
+    요청/응답 하나하나는 DEBUG 라서 평소에는 안 찍혀요.
+    """
+    handlers = [logging.StreamHandler()]
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handlers.append(logging.FileHandler(path, encoding="utf-8"))
+    logging.basicConfig(
+        level=getattr(logging, str(level).upper(), logging.INFO), format=LOG_FORMAT, handlers=handlers, force=True,
+    )
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "계산 중"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}시간 {seconds % 3600 // 60}분"
+    if seconds >= 60:
+        return f"{seconds // 60}분 {seconds % 60}초"
+    return f"{seconds}초"
+
+
+class CrawlMetrics:
+    """요청 지연, 받은 바이트, 재시도, 429, 페이지/채팅 수를 세요
+
+    ChzzkClient 하나에 하나씩 붙어서 그 클라이언트를 같이 쓰는 모든 수집 스레드 것을 합쳐서 세요.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.monotonic()
+            self.requests = 0
+            self.bytes_received = 0
+            self.latency_total = 0.0
+            self.latency_max = 0.0
+            self.retries = 0
+            self.throttles = 0
+            self.errors = 0
+            self.pages = 0
+            self.messages = 0
+
+    def record_request(self, latency, size):
+        with self._lock:
+            self.requests += 1
+            self.bytes_received += size
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def record_retry(self, throttled=False):
+        with self._lock:
+            self.retries += 1
+            if throttled:
+                self.throttles += 1
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def record_page(self, messages):
+        with self._lock:
+            self.pages += 1
+            self.messages += messages
+
+    def snapshot(self):
+        with self._lock:
+            elapsed = max(1e-9, time.monotonic() - self.started)
+            return {
+                "elapsed": round(elapsed, 3),
+                "requests": self.requests,
+                "bytes": self.bytes_received,
+                "retries": self.retries,
+                "throttles": self.throttles,
+                "errors": self.errors,
+                "pages": self.pages,
+                "messages": self.messages,
+                "latency_avg_ms": round(self.latency_total / self.requests * 1000, 1) if self.requests else None,
+                "latency_max_ms": round(self.latency_max * 1000, 1),
+                "requests_per_second": round(self.requests / elapsed, 2),
+                "pages_per_second": round(self.pages / elapsed, 2),
+                "messages_per_second": round(self.messages / elapsed, 1),
+            }
+
+    def summary(self):
+        stats = self.snapshot()
+        latency = f"{stats['latency_avg_ms']:.0f}ms" if stats["latency_avg_ms"] is not None else "-"
+        return (
+            f"요청 {stats['requests']}개 ({stats['requests_per_second']:.1f}/s, 평균 {latency}) · "
+            f"{stats['bytes'] / 1024 / 1024:.1f}MB · 채팅 {stats['messages_per_second']:.0f}/s · "
+            f"재시도 {stats['retries']} · 429 {stats['throttles']}"
+        )
+
+    def write(self, path, **extra):
+        """지금까지의 통계를 JSON 한 줄로 path 에 덧붙여요"""
+        with open(path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"time": time.time(), **self.snapshot(), **extra}, ensure_ascii=False) + "\n")
@@ -0,0 +1,176 @@
+import re
+import unicodedata
+from collections import deque
+
+# 키워드가 이보다 많으면 하나씩 `in` 으로 찾는 것보다 아호-코라식 한 번 훑는 게 빨라요
+AHO_CORASICK_MIN_KEYWORDS = 5
+
+
+def split_terms(text, separator=","):
+    """"a, b ,c" 같은 입력을 ["a", "b", "c"] 로 나눠요"""
+    return [term.strip() for term in text.split(separator) if term.strip()]
+
+
+class AhoCorasick:
+    """여러 키워드를 채팅 한 번 훑어서 다 찾는 다중 패턴 매처"""
+
+    def __init__(self, keywords):
+        self.keywords = list(keywords)
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [set()]
+
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(set())
+                state = next_state
+            self.output[state].add(index)
+
+        pending = deque(self.goto[0].values())
+        while pending:
+            state = pending.popleft()
+            for char, next_state in self.goto[state].items():
+                pending.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] |= self.output[self.fail[next_state]]
+
+    def find(self, text):
+        """text 에 들어 있는 키워드들의 번호를 돌려줘요"""
+        found = set()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+
+        return found
+
+
+class QuerySet:
+    """여러 닉네임/키워드/정규식을 채팅 한 번 훑을 때 같이 확인해요
+
+    닉네임은 집합으로, 키워드는 아호-코라식으로, 정규식은 미리 컴파일해서 찾아요.
+    닉네임과 내용 조건이 둘 다 있으면 둘 다 맞아야 하고 (예전 닉네임 + 채팅 내용 검색과 같아요),
+    match() 는 맞은 조건들의 이름을 돌려줘서 결과마다 어떤 조건에 걸렸는지 알 수 있어요.
+    """
+
+    def __init__(self, nicknames=(), keywords=(), regexes=(), ignore_case=False, ignore_width=False):
+        self.ignore_case = ignore_case
+        self.ignore_width = ignore_width
+        self.nicknames = [nickname for nickname in nicknames if nickname]
+        self.keywords = [keyword for keyword in keywords if keyword]
+        self.regexes = [regex for regex in regexes if regex]
+
+        self._nicknames = {self.normalize(nickname): nickname for nickname in self.nicknames}
+        self._keywords = [self.normalize(keyword) for keyword in self.keywords]
+        flags = re.IGNORECASE if ignore_case else 0
+        self._regexes = [re.compile(regex, flags) for regex in self.regexes]
+        self._matcher = AhoCorasick(self._keywords) if len(self._keywords) >= AHO_CORASICK_MIN_KEYWORDS else None
+
+    @classmethod
+    def from_filters(cls, nickname_filter="", message_filter="", regex_filter="", ignore_case=False, ignore_width=False):
+        """입력칸 문자열에서 만들어요. 닉네임과 채팅 내용은 쉼표로 여러 개를 넣을 수 있어요"""
+        return cls(
+            split_terms(nickname_filter), split_terms(message_filter), [regex_filter] if regex_filter else [],
+            ignore_case, ignore_width,
+        )
+
+    @classmethod
+    def from_spec(cls, spec):
+        """to_spec() 으로 저장해둔 dict 에서 다시 만들어요"""
+        return cls(
+            spec.get("nicknames", ()), spec.get("keywords", ()), spec.get("regexes", ()),
+            spec.get("ignore_case", False), spec.get("ignore_width", False),
+        )
+
+    def to_spec(self):
+        return {
+            "nicknames": self.nicknames,
+            "keywords": self.keywords,
+            "regexes": self.regexes,
+            "ignore_case": self.ignore_case,
+            "ignore_width": self.ignore_width,
+        }
+
+    def describe(self):
+        """"닉네임 a, b · 키워드 ㅋㅋ · 정규식 /^ㅋ+$/" 처럼 사람이 읽을 이름을 만들어요"""
+        parts = []
+        if self.nicknames:
+            parts.append("닉네임 " + ", ".join(self.nicknames))
+        if self.keywords:
+            parts.append("키워드 " + ", ".join(self.keywords))
+        if self.regexes:
+            parts.append("정규식 " + ", ".join(f"/{regex}/" for regex in self.regexes))
+        return " · ".join(parts)
+
+    def is_empty(self):
+        return not (self.nicknames or self.keywords or self.regexes)
+
+    def normalize(self, text):
+        if self.ignore_width:
+            text = unicodedata.normalize("NFKC", text)
+        if self.ignore_case:
+            text = text.casefold()
+        return text
+
+    def match(self, chat_nickname, message):
+        """맞은 조건 이름들의 튜플을 돌려줘요. 안 맞으면 빈 튜플"""
+        matched = []
+
+        if self._nicknames:
+            nickname = self._nicknames.get(self.normalize(chat_nickname or ""))
+            if nickname is None:
+                return ()
+            matched.append(nickname)
+
+        if self._keywords or self._regexes:
+            message_matched = self.match_message(message or "")
+            if not message_matched:
+                return ()
+            matched.extend(message_matched)
+
+        return tuple(matched)
+
+    def match_message(self, message):
+        matched = []
+
+        if self._keywords:
+            text = self.normalize(message)
+            if self._matcher is not None:
+                found = self._matcher.find(text)
+                matched.extend(self.keywords[index] for index in sorted(found))
+            else:
+                matched.extend(keyword for keyword, normalized in zip(self.keywords, self._keywords) if normalized in text)
+
+        if self._regexes:
+            text = unicodedata.normalize("NFKC", message) if self.ignore_width else message
+            matched.extend(f"/{regex.pattern}/" for regex in self._regexes if regex.search(text))
+
+        return matched
+
+    def prefilter(self):
+        """저장소 SQL 에서 미리 좁힐 수 있는 (닉네임 목록, 키워드 목록, 대소문자 구분) 을 돌려줘요
+
+        대소문자/전각 무시나 정규식 때문에 SQL 로 좁히면 빠지는 채팅이 생길 수 있으면 그쪽은 None 이에요.
+        최종 판단은 항상 match() 가 해요.
+        """
+        exact = not self.ignore_case and not self.ignore_width
+        nicknames = self.nicknames if self.nicknames and exact else None
+        keywords = self.keywords if self.keywords and not self.regexes and not self.ignore_width else None
+        return nicknames, keywords, not self.ignore_case
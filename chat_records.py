@@ -0,0 +1,48 @@
+import sys
+
+
+def format_timestamp(milliseconds):
+    """밀리초를 hh:mm:ss 형식으로 변환"""
+    total_seconds = milliseconds // 1000
+    hours = total_seconds // 3600
+    minutes = (total_seconds % 3600) // 60
+    seconds = total_seconds % 60
+    return f"{hours:02}:{minutes:02}:{seconds:02}"
+
+
+def video_time_url(video_id, milliseconds=None):
+    if milliseconds is None:
+        return f"https://chzzk.naver.com/video/{video_id}"
+    return f"https://chzzk.naver.com/video/{video_id}?currentTime={milliseconds // 1000}"
+
+
+def vod_tab_title(video_id, title, publish_date):
+    if title and publish_date:
+        return f'{publish_date.split(" ")[0]} - {title}'
+    return f'영상 {video_id}'
+
+
+class ChatRecord:
+    """찾은 채팅 한 줄
+
+    HTML 이나 링크는 들고 있지 않고 화면에 그리거나 저장할 때 그때그때 만들어요.
+    같은 사람이 수천 번 채팅하니까 닉네임과 userIdHash 는 intern 해서 문자열 하나를 같이 써요.
+    """
+    __slots__ = ("video_no", "time_ms", "nickname", "user_id_hash", "message", "matched")
+
+    def __init__(self, video_no, time_ms, nickname, message, user_id_hash=None, matched=()):
+        self.video_no = int(video_no)
+        self.time_ms = time_ms
+        self.nickname = sys.intern(nickname) if nickname else nickname
+        self.user_id_hash = sys.intern(user_id_hash) if user_id_hash else user_id_hash
+        self.message = message
+        self.matched = matched  # 걸린 검색 조건 이름들
+
+    def timestamp(self):
+        return format_timestamp(self.time_ms)
+
+    def url(self):
+        return video_time_url(self.video_no, self.time_ms)
+
+    def plain_text(self):
+        return f"{self.timestamp()} - {self.nickname}: {self.message}"
@@ -0,0 +1,446 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from chat_records import ChatRecord
+
+log = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = os.path.join(os.path.expanduser("~"), ".antys", "chats.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vods (
+    video_no INTEGER PRIMARY KEY,
+    complete INTEGER NOT NULL DEFAULT 0,
+    chat_count INTEGER NOT NULL DEFAULT 0,
+    fetched_at REAL,
+    channel_id TEXT,
+    title TEXT,
+    publish_date TEXT,
+    duration INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS chats (
+    video_no INTEGER NOT NULL,
+    player_message_time INTEGER NOT NULL,
+    user_id_hash TEXT,
+    nickname TEXT,
+    content TEXT,
+    profile TEXT
+);
+
+CREATE TABLE IF NOT EXISTS checkpoints (
+    video_no INTEGER NOT NULL,
+    range_start INTEGER NOT NULL,
+    range_end INTEGER,
+    cursor INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (video_no, range_start)
+);
+
+CREATE TABLE IF NOT EXISTS channels (
+    channel_id TEXT PRIMARY KEY,
+    listed INTEGER NOT NULL DEFAULT 0,
+    listed_at REAL
+);
+
+CREATE TABLE IF NOT EXISTS watched_channels (
+    channel_id TEXT PRIMARY KEY,
+    added_at REAL,
+    polled_at REAL
+);
+
+-- channel_id 가 '' 인 조건은 지켜보는 모든 채널에 써요
+CREATE TABLE IF NOT EXISTS saved_queries (
+    name TEXT NOT NULL,
+    channel_id TEXT NOT NULL DEFAULT '',
+    spec TEXT NOT NULL,
+    added_at REAL,
+    PRIMARY KEY (name, channel_id)
+);
+
+CREATE INDEX IF NOT EXISTS chats_by_vod ON chats (video_no, player_message_time);
+CREATE INDEX IF NOT EXISTS chats_by_nickname ON chats (nickname, video_no, player_message_time);
+"""
+
+# 같은 채팅이 두 번 들어오면 (겹쳐 받은 페이지 등) INSERT OR IGNORE 로 그냥 버려요
+UNIQUE_CHATS_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS chats_unique ON chats (
+    video_no, player_message_time, IFNULL(user_id_hash, ''), IFNULL(content, '')
+)
+"""
+
+# trigram 토크나이저라서 세 글자 이상이면 부분 문자열 검색도 색인을 타요
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS chats_fts USING fts5 (
+    content, content='chats', content_rowid='rowid', tokenize='trigram'
+);
+
+CREATE TRIGGER IF NOT EXISTS chats_fts_insert AFTER INSERT ON chats BEGIN
+    INSERT INTO chats_fts (rowid, content) VALUES (new.rowid, new.content);
+END;
+
+CREATE TRIGGER IF NOT EXISTS chats_fts_delete AFTER DELETE ON chats BEGIN
+    INSERT INTO chats_fts (chats_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+"""
+
+FTS_MIN_QUERY_LENGTH = 3
+
+VOD_META_COLUMNS = {"channel_id": "TEXT", "title": "TEXT", "publish_date": "TEXT", "duration": "INTEGER"}
+
+
+class ChatStore:
+    """다시보기별 원본 채팅을 저장해두는 로컬 SQLite 캐시
+
+    한 번 끝까지 수집된 다시보기는 complete 로 표시되고,
+    그 뒤로는 서버에 요청하지 않고 여기서 바로 걸러내요.
+    스레드마다 커넥션을 따로 열어서 여러 수집 스레드가 같이 써도 괜찮아요.
+    그래서 ":memory:" 는 못 써요 (스레드마다 빈 DB 가 따로 생겨요). 잠깐 쓸 거면 임시 파일을 주세요.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        if path == ":memory:":
+            raise ValueError("ChatStore 는 스레드마다 커넥션을 여니까 파일 경로가 필요해요 (\":memory:\" 는 못 써요)")
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._local = threading.local()
+        self.has_fts = False
+        self._create_schema()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _create_schema(self):
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+
+        existing = {row[1] for row in conn.execute("PRAGMA table_info(vods)")}
+        for column, column_type in VOD_META_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE vods ADD COLUMN {column} {column_type}")
+
+        self._create_unique_index(conn)
+        self._scope_saved_queries(conn)
+
+        had_fts = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'chats_fts'"
+        ).fetchone() is not None
+        try:
+            conn.executescript(FTS_SCHEMA)
+        except sqlite3.OperationalError as e:
+            # 오래된 SQLite 라 FTS5/trigram 이 없으면 그냥 순차 검색으로 버텨요
+            log.warning("전문 검색 색인을 못 만들었어요: %s", e)
+            return
+
+        if not had_fts:
+            # 색인이 생기기 전에 모아둔 채팅도 한 번은 넣어줘야 해요
+            with conn:
+                conn.execute("INSERT INTO chats_fts (chats_fts) VALUES ('rebuild')")
+        self.has_fts = True
+
+    def _create_unique_index(self, conn):
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'chats_unique'").fetchone() is not None:
+            return
+
+        # 색인이 생기기 전에 두 번 들어간 채팅은 하나만 남기고 지워야 색인을 만들 수 있어요
+        with conn:
+            removed = conn.execute(
+                "DELETE FROM chats WHERE rowid NOT IN ("
+                "SELECT MIN(rowid) FROM chats "
+                "GROUP BY video_no, player_message_time, IFNULL(user_id_hash, ''), IFNULL(content, ''))"
+            ).rowcount
+            if removed:
+                log.warning("두 번 저장된 채팅 %d개를 지웠어요", removed)
+                conn.execute(
+                    "UPDATE vods SET chat_count = (SELECT COUNT(*) FROM chats WHERE chats.video_no = vods.video_no)"
+                )
+            conn.execute(UNIQUE_CHATS_INDEX)
+
+    def _scope_saved_queries(self, conn):
+        if "channel_id" in {row[1] for row in conn.execute("PRAGMA table_info(saved_queries)")}:
+            return
+
+        # 채널 없이 저장해둔 예전 조건들은 모든 채널에 쓰던 거라 그대로 '' 로 옮겨요
+        with conn:
+            conn.execute("ALTER TABLE saved_queries RENAME TO saved_queries_old")
+            conn.executescript(SCHEMA)
+            conn.execute(
+                "INSERT INTO saved_queries (name, channel_id, spec, added_at) "
+                "SELECT name, '', spec, added_at FROM saved_queries_old"
+            )
+            conn.execute("DROP TABLE saved_queries_old")
+
+    def save_vod_meta(self, channel_id, vods):
+        """채널의 다시보기 목록 API 에서 받은 영상 정보를 저장해서 채널/제목으로 찾을 수 있게 해요"""
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO vods (video_no, channel_id, title, publish_date, duration) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(video_no) DO UPDATE SET channel_id = excluded.channel_id, "
+                "title = excluded.title, publish_date = excluded.publish_date, duration = excluded.duration",
+                [
+                    (
+                        int(vod["videoNo"]),
+                        channel_id,
+                        vod.get("videoTitle"),
+                        vod.get("publishDate"),
+                        vod.get("duration"),
+                    )
+                    for vod in vods
+                ],
+            )
+
+    def is_channel_listed(self, channel_id):
+        """채널 목록을 끝까지 (또는 받아둔 다시보기까지) 다 받아둔 적이 있으면 True"""
+        row = self._connection().execute(
+            "SELECT listed FROM channels WHERE channel_id = ?", (channel_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def set_channel_listed(self, channel_id, listed):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO channels (channel_id, listed, listed_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(channel_id) DO UPDATE SET listed = excluded.listed, listed_at = excluded.listed_at",
+                (channel_id, int(listed), time.time()),
+            )
+
+    def channel_vods(self, channel_id):
+        """목록 API 로 받아둔 채널의 다시보기들을 API 응답과 같은 모양의 dict 로, 최신순으로 돌려줘요"""
+        rows = self._connection().execute(
+            "SELECT video_no, title, publish_date, duration FROM vods "
+            "WHERE channel_id = ? AND title IS NOT NULL ORDER BY video_no DESC",
+            (channel_id,),
+        ).fetchall()
+        return [
+            {
+                "videoNo": video_no,
+                "videoTitle": title,
+                "publishDate": publish_date,
+                "duration": duration,
+                "channel": {"channelId": channel_id},
+            }
+            for video_no, title, publish_date, duration in rows
+        ]
+
+    def is_complete(self, video_no):
+        row = self._connection().execute(
+            "SELECT complete FROM vods WHERE video_no = ?", (int(video_no),)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def reset_vod(self, video_no):
+        """덜 받아진 다시보기의 채팅을 비우고 처음부터 다시 받을 준비를 해요"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM chats WHERE video_no = ?", (int(video_no),))
+            conn.execute("DELETE FROM checkpoints WHERE video_no = ?", (int(video_no),))
+            conn.execute(
+                "INSERT INTO vods (video_no, complete, chat_count, fetched_at) VALUES (?, 0, 0, ?) "
+                "ON CONFLICT(video_no) DO UPDATE SET complete = 0, chat_count = 0, fetched_at = excluded.fetched_at",
+                (int(video_no), time.time()),
+            )
+
+    def checkpoints(self, video_no):
+        """받다 만 다시보기의 (구간 시작, 구간 끝, 다음 cursor, 끝났는지) 목록"""
+        rows = self._connection().execute(
+            "SELECT range_start, range_end, cursor, done FROM checkpoints "
+            "WHERE video_no = ? ORDER BY range_start",
+            (int(video_no),),
+        ).fetchall()
+        return [(range_start, range_end, cursor, bool(done)) for range_start, range_end, cursor, done in rows]
+
+    def start_checkpoints(self, video_no, time_ranges):
+        """처음부터 받는 다시보기의 구간별 체크포인트를 만들어요"""
+        self.reset_vod(video_no)
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO checkpoints (video_no, range_start, range_end, cursor) VALUES (?, ?, ?, ?)",
+                [(int(video_no), start, end, start) for start, end in time_ranges],
+            )
+        return self.checkpoints(video_no)
+
+    def finish_range(self, video_no, range_start):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE checkpoints SET done = 1 WHERE video_no = ? AND range_start = ?",
+                (int(video_no), range_start),
+            )
+
+    def add_chats(self, video_no, rows, range_start=None, cursor=None):
+        """rows: (player_message_time, user_id_hash, nickname, content, profile) 튜플 목록
+
+        cursor 를 같이 주면 채팅과 체크포인트를 한 트랜잭션으로 저장해서,
+        어디서 끊기든 저장된 채팅과 cursor 가 어긋나지 않아요.
+        """
+        video_no = int(video_no)
+        conn = self._connection()
+        with conn:
+            if cursor is not None:
+                conn.execute(
+                    "UPDATE checkpoints SET cursor = ? WHERE video_no = ? AND range_start = ?",
+                    (cursor, video_no, range_start),
+                )
+            if not rows:
+                return
+            inserted = conn.executemany(
+                "INSERT OR IGNORE INTO chats (video_no, player_message_time, user_id_hash, nickname, content, profile) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(video_no, *row) for row in rows],
+            ).rowcount
+            conn.execute(
+                "UPDATE vods SET chat_count = chat_count + ? WHERE video_no = ?",
+                (inserted, video_no),
+            )
+
+    def mark_complete(self, video_no):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "UPDATE vods SET complete = 1, fetched_at = ? WHERE video_no = ?",
+                (time.time(), int(video_no)),
+            )
+            conn.execute("DELETE FROM checkpoints WHERE video_no = ?", (int(video_no),))
+
+    def search(self, query=None, video_nos=None, include_partial=False, start_time=None, end_time=None):
+        """다 받아둔 다시보기들에서 QuerySet 에 맞는 채팅을 찾아요
+
+        ChatRecord 를 최신 다시보기부터, 각 다시보기 안에서는 시간순으로 돌려줘요.
+        닉네임은 색인으로, 키워드는 전문 검색 색인으로 먼저 좁히고, 남은 것만 query.match() 로 확인해요.
+        include_partial 이면 받다 만 다시보기에서 저장된 부분도 같이 찾아요.
+        """
+        where = [] if include_partial else ["v.complete = 1"]
+        params = []
+
+        if start_time is not None:
+            where.append("c.player_message_time >= ?")
+            params.append(start_time)
+
+        if end_time is not None:
+            where.append("c.player_message_time < ?")
+            params.append(end_time)
+
+        nicknames, keywords, case_sensitive = query.prefilter() if query is not None else (None, None, True)
+
+        if nicknames:
+            where.append(f"c.nickname IN ({', '.join('?' * len(nicknames))})")
+            params.extend(nicknames)
+
+        if keywords:
+            if self.has_fts and all(len(keyword) >= FTS_MIN_QUERY_LENGTH for keyword in keywords):
+                phrases = " OR ".join('"' + keyword.replace('"', '""') + '"' for keyword in keywords)
+                where.append("c.rowid IN (SELECT rowid FROM chats_fts WHERE chats_fts MATCH ?)")
+                params.append(phrases)
+            elif case_sensitive:
+                where.append("(" + " OR ".join("instr(c.content, ?) > 0" for _ in keywords) + ")")
+                params.extend(keywords)
+
+        if video_nos is not None:
+            video_nos = [int(video_no) for video_no in video_nos]
+            if not video_nos:
+                return
+            where.append(f"c.video_no IN ({', '.join('?' * len(video_nos))})")
+            params.extend(video_nos)
+
+        cursor = self._connection().execute(
+            "SELECT c.video_no, c.player_message_time, c.nickname, c.content, c.user_id_hash "
+            "FROM chats c JOIN vods v ON v.video_no = c.video_no "
+            f"WHERE {' AND '.join(where) or '1'} "
+            "ORDER BY c.video_no DESC, c.player_message_time, c.rowid",
+            params,
+        )
+        for video_no, message_time, nickname, content, user_id_hash in cursor:
+            matched = query.match(nickname, content) if query is not None else ()
+            if query is None or matched:
+                yield ChatRecord(video_no, message_time, nickname, content, user_id_hash, matched)
+
+    def message_times(self, video_no):
+        """저장된 채팅의 playerMessageTime 만 하나씩 돌려줘요 (타임라인 계산용)
+
+        목록으로 모으지 않아서 받는 쪽이 바로 배열에 담을 수 있어요.
+        """
+        rows = self._connection().execute(
+            "SELECT player_message_time FROM chats WHERE video_no = ?", (int(video_no),)
+        )
+        for (message_time,) in rows:
+            yield message_time
+
+    def watch_channel(self, channel_id):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO watched_channels (channel_id, added_at) VALUES (?, ?)", (channel_id, time.time()),
+            )
+
+    def unwatch_channel(self, channel_id):
+        """채널을 그만 지켜보고, 그 채널에만 쓰던 검색 조건도 지워요"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM watched_channels WHERE channel_id = ?", (channel_id,))
+            conn.execute("DELETE FROM saved_queries WHERE channel_id = ?", (channel_id,))
+
+    def watched_channels(self):
+        """지켜보는 채널 ID 들을 가장 오래 안 훑은 것부터 돌려줘요"""
+        rows = self._connection().execute(
+            "SELECT channel_id FROM watched_channels ORDER BY COALESCE(polled_at, 0), added_at"
+        )
+        return [channel_id for (channel_id,) in rows]
+
+    def mark_polled(self, channel_id):
+        conn = self._connection()
+        with conn:
+            conn.execute("UPDATE watched_channels SET polled_at = ? WHERE channel_id = ?", (time.time(), channel_id))
+
+    def save_query(self, name, spec, channel_id=None):
+        """검색 조건 (QuerySet.to_spec()) 을 이름으로 저장해요. 같은 채널에 같은 이름이면 덮어써요
+
+        channel_id 를 주면 그 채널 다시보기에만, 안 주면 지켜보는 모든 채널에 써요.
+        """
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO saved_queries (name, channel_id, spec, added_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(name, channel_id) DO UPDATE SET spec = excluded.spec",
+                (name, channel_id or "", json.dumps(spec, ensure_ascii=False), time.time()),
+            )
+
+    def delete_query(self, name, channel_id=None):
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM saved_queries WHERE name = ? AND channel_id = ?", (name, channel_id or ""))
+
+    def saved_queries(self, channel_id=None):
+        """저장해둔 (이름, 채널 ID 또는 None, 조건 dict) 들을 저장한 순서대로 돌려줘요
+
+        channel_id 를 주면 그 채널에 쓸 조건 (그 채널 것과 모든 채널 것) 만 돌려줘요.
+        """
+        query = "SELECT name, channel_id, spec FROM saved_queries"
+        params = []
+        if channel_id is not None:
+            query += " WHERE channel_id IN (?, '')"
+            params.append(channel_id)
+        rows = self._connection().execute(query + " ORDER BY added_at", params)
+        return [(name, channel or None, json.loads(spec)) for name, channel, spec in rows]
+
+    def complete_vods(self, channel_ids=None):
+        """다 받아둔 다시보기 정보를 최신순으로 돌려줘요"""
+        query = "SELECT video_no, channel_id, title, publish_date FROM vods WHERE complete = 1"
+        params = []
+        if channel_ids:
+            query += f" AND channel_id IN ({', '.join('?' * len(channel_ids))})"
+            params.extend(channel_ids)
+        query += " ORDER BY video_no DESC"
+        return self._connection().execute(query, params).fetchall()
@@ -0,0 +1,73 @@
+try:
+    import numpy as np  # 있으면 몇백만 개도 한 번에 세요 (pip install numpy)
+except ImportError:
+    np = None
+
+from chat_records import format_timestamp, video_time_url
+
+TIMELINE_BIN_MS = 60 * 1000
+SPIKE_COUNT = 5
+
+
+def chat_histogram(times_ms, duration_ms=None, bin_ms=TIMELINE_BIN_MS):
+    """채팅 시간들을 bin_ms 칸마다 몇 개씩인지 세서 돌려줘요
+
+    numpy 가 있으면 bincount 한 번으로 세고, 없으면 파이썬으로 세요.
+    칸 수는 다시보기 길이와 가장 늦은 채팅 중 긴 쪽에 맞춰요.
+    """
+    if np is not None:
+        times = np.asarray(times_ms, dtype=np.int64)
+        length = max(duration_ms or 0, int(times.max()) + 1 if times.size else 0)
+        bin_count = max(1, -(-length // bin_ms))
+        return np.bincount(times // bin_ms, minlength=bin_count)
+
+    times = list(times_ms)
+    length = max(duration_ms or 0, max(times) + 1 if times else 0)
+    counts = [0] * max(1, -(-length // bin_ms))
+    for time_ms in times:
+        counts[time_ms // bin_ms] += 1
+    return counts
+
+
+def top_spikes(counts, bin_ms=TIMELINE_BIN_MS, top_n=SPIKE_COUNT, window_bins=3):
+    """채팅이 가장 몰린 구간 top_n 개를 [(시작 ms, 채팅 수)] 로 돌려줘요
+
+    window_bins 칸짜리 창으로 합친 다음 큰 것부터 고르고, 이미 고른 구간과 겹치는 건 건너뛰어요.
+    """
+    if np is not None:
+        counts = np.asarray(counts, dtype=np.int64)
+        window_bins = max(1, min(window_bins, counts.size))
+        sums = np.convolve(counts, np.ones(window_bins, dtype=np.int64), mode="valid")
+        order = np.argsort(-sums, kind="stable").tolist()
+        sums = sums.tolist()
+    else:
+        counts = list(counts)
+        window_bins = max(1, min(window_bins, len(counts)))
+        sums = [sum(counts[start:start + window_bins]) for start in range(len(counts) - window_bins + 1)]
+        order = sorted(range(len(sums)), key=lambda start: -sums[start])
+
+    spikes = []
+    for start in order:
+        if len(spikes) >= top_n or sums[start] == 0:
+            break
+        if any(abs(start - picked) < window_bins for picked, _ in spikes):
+            continue
+        spikes.append((start, sums[start]))
+
+    return [(start * bin_ms, int(total)) for start, total in spikes]
+
+
+def vod_timeline(store, video_no, duration_ms=None, bin_ms=TIMELINE_BIN_MS, top_n=SPIKE_COUNT, cancelled=None):
+    """저장된 모든 채팅으로 (칸별 채팅 수, 몰린 구간들) 을 만들어요. 저장된 게 없거나 cancelled() 가 참이면 None"""
+    times = store.message_times(video_no)
+    # numpy 가 있으면 파이썬 목록을 거치지 않고 바로 배열에 담아요
+    times = np.fromiter(times, dtype=np.int64) if np is not None else list(times)
+    if not len(times) or (cancelled is not None and cancelled()):
+        return None
+    counts = chat_histogram(times, duration_ms, bin_ms)
+    return counts, top_spikes(counts, bin_ms, top_n)
+
+
+def spike_links(video_no, spikes):
+    """몰린 구간들을 (시간 글자, 채팅 수, 그 시간으로 가는 링크) 로 바꿔요"""
+    return [(format_timestamp(start_ms), count, video_time_url(video_no, start_ms)) for start_ms, count in spikes]
@@ -0,0 +1,174 @@
+"""지켜보는 채널의 새 다시보기를 뒤에서 미리 받아두는 지켜보기 모드
+
+저장소에 지켜볼 채널 (watch_channel) 과 검색 조건 (save_query, 채널마다 또는 모든 채널에) 을 넣어두면 ChannelWatcher 가
+WATCH_INTERVAL 마다 채널 목록을 훑어서 아직 안 받은 다시보기를 받아두고,
+다 받은 다시보기마다 저장해둔 검색 조건으로 찾은 채팅을 바로 알려줘요.
+그래서 나중에 검색하면 네트워크 없이 저장소에서 바로 찾아져요.
+채널을 지켜보지 않아도 ingest_vods() 로 방금 불러온 목록의 최신 다시보기만 같은 방식으로 미리 받아둘 수 있어요.
+"""
+import logging
+import re
+import threading
+
+from chat_crawler import ChatCrawler, load_channel_vods
+from chat_export import vod_meta
+from chat_query import QuerySet
+from chzzk_api import ChzzkApiError, ChzzkClient, RateLimiter
+
+log = logging.getLogger(__name__)
+
+WATCH_INTERVAL = 10 * 60
+# 사람이 누른 수집보다 한참 느리게, 서버에 부담 안 되게 받아요
+WATCH_REQUESTS_PER_SECOND = 1.0
+# 채널마다 최신 다시보기 몇 개까지 미리 받아둘지
+WATCH_BACKFILL = 20
+# 다시보기 목록을 불러오면 최신 몇 개를 미리 받아둘지
+PREFETCH_COUNT = 5
+BUSY_CHECK_INTERVAL = 5.0
+
+
+class YieldingCrawler(ChatCrawler):
+    """should_yield() 가 참이 되면 받던 곳을 체크포인트에 남기고 바로 멈추는 ChatCrawler"""
+
+    def __init__(self, *args, should_yield=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.should_yield = should_yield
+        self.from_store = False
+
+    def is_cancelled(self):
+        if self.should_yield is not None and self.should_yield():
+            self.stop()
+        return super().is_cancelled()
+
+    def filter_from_store(self):
+        # 기다리는 사이에 다른 수집이 다 받아뒀으면 알리는 것도 그쪽 몫이라 다시 훑지 않아요
+        self.from_store = True
+        return [], None
+
+
+class ChannelWatcher:
+    """지켜보는 채널들의 새 다시보기를 낮은 우선순위로 받아두고, 저장해둔 검색 조건에 맞는 채팅을 알려줘요
+
+    요청은 자기 RateLimiter (기본 초당 WATCH_REQUESTS_PER_SECOND 번) 로만 보내요.
+    is_busy() 가 참이면 (사람이 누른 수집이 돌고 있으면) 받던 다시보기를 멈췄다가 한가해지면 이어받아요.
+    다시보기 하나를 다 받을 때마다 on_matches(조건 이름, 다시보기 정보, ChatRecord 목록) 을 불러요.
+    """
+
+    def __init__(
+        self, store, client=None, interval=WATCH_INTERVAL, backfill=WATCH_BACKFILL,
+        on_matches=None, is_busy=None, archive=None,
+    ):
+        self.store = store
+        self.client = client or ChzzkClient(RateLimiter(WATCH_REQUESTS_PER_SECOND))
+        self.interval = interval
+        self.backfill = backfill
+        self.on_matches = on_matches
+        self.is_busy = is_busy
+        self.archive = archive
+        self._stop = threading.Event()
+        self._crawler = None
+
+    def stop(self):
+        self._stop.set()
+        crawler = self._crawler
+        if crawler is not None:
+            crawler.stop()
+
+    def stopped(self):
+        return self._stop.is_set()
+
+    def should_yield(self):
+        return self.stopped() or (self.is_busy is not None and self.is_busy())
+
+    def run(self):
+        """stop() 할 때까지 interval 초마다 poll() 해요"""
+        while not self.stopped():
+            try:
+                self.poll()
+            except ChzzkApiError as e:
+                log.warning("[지켜보기] 채널을 못 훑었어요, 다음에 다시 할께요: %s", e)
+            except Exception:
+                # 여기서 스레드가 끝나버리면 켜져 있는 것처럼 보이는데 아무것도 안 받아요
+                log.exception("[지켜보기] 채널을 훑다가 오류가 났어요, 다음에 다시 할께요")
+            self._stop.wait(self.interval)
+
+    def poll(self):
+        """지켜보는 채널을 한 번씩 훑어서 아직 안 받은 다시보기를 최신순으로 받아요. 다 받은 다시보기 수를 돌려줘요"""
+        ingested = 0
+        for channel_id in self.store.watched_channels():
+            if not self.wait_idle():
+                break
+
+            vods = load_channel_vods(self.client, self.store, channel_id, cancelled=self.stopped)
+            self.store.mark_polled(channel_id)
+            ingested += self.ingest_vods(vods[:self.backfill], channel_id)
+
+        return ingested
+
+    def ingest_vods(self, vods, channel_id=None):
+        """channel_id 채널의 다시보기들을 순서대로 끝까지 받아둬요. 다 받은 다시보기 수를 돌려줘요"""
+        ingested = 0
+        for vod in vods:
+            # 바빠서 멈췄으면 한가해진 다음 같은 다시보기부터 이어받아요
+            while not self.store.is_complete(vod["videoNo"]):
+                if not self.wait_idle():
+                    return ingested
+                if self.ingest(vod, channel_id):
+                    ingested += 1
+                elif not self.should_yield():
+                    break
+        return ingested
+
+    def wait_idle(self):
+        """한가해질 때까지 기다려요. 그 사이에 stop() 되면 False"""
+        while self.is_busy is not None and self.is_busy():
+            if self._stop.wait(BUSY_CHECK_INTERVAL):
+                return False
+        return not self.stopped()
+
+    def ingest(self, vod, channel_id=None):
+        """다시보기 하나를 저장소에 받아두고 저장해둔 조건들로 찾아요. 끝까지 받았으면 True"""
+        video_id = str(vod["videoNo"])
+        log.info("[지켜보기] %s 를 미리 받아둘께요", video_id)
+
+        # 조건 없이 저장만 하고, 찾는 건 다 받은 다음 조건마다 저장소에서 해요
+        crawler = self._crawler = YieldingCrawler(
+            video_id, QuerySet(), self.store, self.client, (vod.get("duration") or 0) * 1000,
+            archive=self.archive, should_yield=self.should_yield,
+        )
+        try:
+            _, error_message = crawler.run()
+        finally:
+            self._crawler = None
+
+        if error_message:
+            log.warning("[지켜보기] %s %s", video_id, error_message)
+            return False
+        if not self.store.is_complete(video_id):
+            log.info("[지켜보기] %s 는 잠깐 멈췄어요, 한가해지면 이어받을께요", video_id)
+            return False
+
+        if not crawler.from_store:
+            self.report_matches(vod, channel_id or (vod.get("channel") or {}).get("channelId"))
+        return True
+
+    def report_matches(self, vod, channel_id):
+        """지켜보는 채널의 다시보기면 그 채널에 쓸 조건마다 찾은 채팅을 on_matches 로 알려줘요"""
+        if self.on_matches is None or channel_id not in self.store.watched_channels():
+            return
+
+        meta = vod_meta(vod["videoNo"], vod.get("videoTitle"), vod.get("publishDate"), channel_id)
+        for name, query in self.saved_queries(channel_id):
+            chats = list(self.store.search(query, [vod["videoNo"]]))
+            if chats:
+                self.on_matches(name, meta, chats)
+
+    def saved_queries(self, channel_id):
+        """이 채널 다시보기에 쓸 (이름, QuerySet) 들"""
+        queries = []
+        for name, _, spec in self.store.saved_queries(channel_id or ""):
+            try:
+                queries.append((name, QuerySet.from_spec(spec)))
+            except re.error as e:
+                log.warning("[지켜보기] 저장해둔 조건 %s 의 정규식이 틀렸어요: %s", name, e)
+        return queries
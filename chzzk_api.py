@@ -0,0 +1,261 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from chat_metrics import CrawlMetrics
+
+try:
+    import orjson  # 있으면 JSON 을 훨씬 빠르게 읽어요 (pip install orjson)
+except ImportError:
+    orjson = None
+
+log = logging.getLogger(__name__)
+
+# 벤치마크용 가짜 서버 같은 데로 보내고 싶으면 ANTYS_API_BASE 를 바꿔요
+API_BASE = os.environ.get("ANTYS_API_BASE", "https://api.chzzk.naver.com/service/v1")
+
+DEFAULT_MAX_WORKERS = 3
+DEFAULT_REQUESTS_PER_SECOND = 5.0
+
+DEFAULT_TIMEOUT = (5, 15)
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 30.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+CANCEL_POLL_INTERVAL = 0.2
+
+SHARD_WORKERS = 4
+MIN_SHARD_MS = 30 * 60 * 1000
+MAX_SHARDS = 32
+
+
+def json_loads(data):
+    """orjson 이 있으면 그걸로, 없으면 표준 json 으로 읽어요. 깨진 JSON 은 둘 다 ValueError 예요"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def json_dumps(value):
+    """json_loads 의 반대. 한글은 그대로 UTF-8 바이트로 써요"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def chats_url(video_id):
+    return f"{API_BASE}/videos/{video_id}/chats"
+
+
+def parse_channel_id(text):
+    """채널 홈 링크나 채널 ID 에서 32자리 채널 ID 를 꺼내요. 못 찾으면 None"""
+    match = re.search(r'(?:^|/)([a-z0-9]{32})/?$', text.strip())
+    return match.group(1) if match else None
+
+
+def videos_url(channel_id):
+    return f"{API_BASE}/channels/{channel_id}/videos"
+
+
+def list_headers():
+    return {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+        "Referer": "https://chzzk.naver.com/"
+    }
+
+
+def chat_headers(video_id):
+    return {
+        "Accept": "application/json",
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/134.0.0.0 Safari/537.36 Edg/134.0.0.0",
+        "Referer": f"https://chzzk.naver.com/video/{video_id}"
+    }
+
+
+class ChzzkApiError(Exception):
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class RateLimiter:
+    """여러 수집 스레드가 같이 쓰는 초당 요청 수 제한 (토큰 버킷)
+
+    acquire() 는 토큰이 생길 때까지 기다렸다가 돌아와요. 기다리다 cancelled() 가 참이 되면 토큰 없이 False 를 돌려줘요.
+    다시보기를 몇 개를 동시에 받든 전체 요청 속도는 rate 를 넘지 않아요.
+    서버가 막거나 느려지면 속도를 절반으로 줄이고, 괜찮아지면 max_rate 까지 천천히 다시 올려요.
+    """
+
+    SLOW_FACTOR = 3.0
+
+    def __init__(self, rate=DEFAULT_REQUESTS_PER_SECOND, burst=None, min_rate=0.2):
+        self._lock = threading.Lock()
+        self.rate = float(rate)
+        self.max_rate = float(rate)
+        self.min_rate = min_rate
+        self.capacity = float(burst or max(1.0, rate))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._latency = None
+
+    def set_rate(self, rate):
+        with self._lock:
+            self._refill()
+            self.rate = float(rate)
+            self.max_rate = float(rate)
+
+    def on_success(self, latency):
+        with self._lock:
+            if self._latency is None:
+                self._latency = latency
+            slow = latency > self._latency * self.SLOW_FACTOR
+            self._latency = self._latency * 0.9 + latency * 0.1
+            if slow:
+                self.rate = max(self.min_rate, self.rate * 0.8)
+            else:
+                self.rate = min(self.max_rate, self.rate + 0.1)
+
+    def on_throttle(self):
+        with self._lock:
+            self._refill()
+            self.rate = max(self.min_rate, self.rate / 2)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """토큰이 있으면 하나 가져가고 0 을, 없으면 기다려야 할 초를 돌려줘요 (asyncio 쪽은 이걸로 기다려요)"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, cancelled=None):
+        while True:
+            wait = self.try_acquire()
+            if wait <= 0:
+                return True
+            if cancelled is not None and cancelled():
+                return False
+            time.sleep(min(wait, CANCEL_POLL_INTERVAL))
+
+
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt):
+    """지터를 섞은 지수 백오프: 여러 스레드가 한꺼번에 다시 몰려가지 않게 해요"""
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class ChzzkClient:
+    """치지직 API 공용 HTTP 클라이언트
+
+    세션 하나로 연결을 재사용하고, 요청마다 타임아웃을 걸어요.
+    429/5xx 나 연결 오류는 Retry-After 나 백오프만큼 쉬었다가 다시 시도하고,
+    모든 요청은 같은 RateLimiter 를 거쳐서 보내요.
+    """
+
+    def __init__(self, limiter=None, timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, pool_size=16, metrics=None):
+        self.limiter = limiter or RateLimiter()
+        self.metrics = metrics or CrawlMetrics()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get_json(self, url, params=None, headers=None, cancelled=None):
+        """응답 JSON 을 돌려줘요. 기다리는 중에 cancelled() 가 참이 되면 None 을 돌려줘요"""
+        for attempt in range(self.max_retries + 1):
+            if cancelled is not None and cancelled():
+                return None
+
+            # 토큰을 기다리는 사이에 비켜줘야 할 수도 있어서 보내기 직전에 한 번 더 봐요
+            if not self.limiter.acquire(cancelled) or (cancelled is not None and cancelled()):
+                return None
+            started = time.monotonic()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.record_error()
+                if attempt == self.max_retries:
+                    raise ChzzkApiError(f"연결 실패: {e}") from e
+                self.metrics.record_retry()
+                log.warning("연결 실패, 다시 시도할께요 (%d/%d): %s", attempt + 1, self.max_retries, e)
+                if not self._sleep(backoff_delay(attempt), cancelled):
+                    return None
+                continue
+
+            latency = time.monotonic() - started
+            self.metrics.record_request(latency, len(response.content))
+            log.debug("GET %s %s -> %d (%.0fms)", url, params, response.status_code, latency * 1000)
+
+            if response.status_code == 200:
+                self.limiter.on_success(latency)
+                return json_loads(response.content)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                self.metrics.record_error()
+                raise ChzzkApiError(f"HTTP 상태 코드: {response.status_code}", response.status_code)
+
+            if response.status_code == 429:
+                self.limiter.on_throttle()
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = backoff_delay(attempt)
+            self.metrics.record_retry(throttled=response.status_code == 429)
+            log.warning("HTTP 상태 코드: %d, %.1f초 쉬었다가 다시 시도할께요", response.status_code, delay)
+            if not self._sleep(delay, cancelled):
+                return None
+
+    @staticmethod
+    def _sleep(delay, cancelled):
+        deadline = time.monotonic() + delay
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            if cancelled is not None and cancelled():
+                return False
+            time.sleep(min(remaining, CANCEL_POLL_INTERVAL))
+
+
+def split_time_ranges(duration_ms, min_range_ms=MIN_SHARD_MS, max_ranges=MAX_SHARDS):
+    """다시보기 길이를 [시작, 끝) playerMessageTime 구간들로 나눠요
+
+    마지막 구간의 끝은 None 이라 영상 길이보다 늦게 찍힌 채팅도 빠지지 않아요.
+    길이를 모르거나 짧은 다시보기는 구간 하나로 처음부터 끝까지 받아요.
+    """
+    range_count = min(max_ranges, int(duration_ms // min_range_ms)) if duration_ms else 1
+    if range_count <= 1:
+        return [(0, None)]
+
+    range_length = duration_ms // range_count
+    starts = [i * range_length for i in range(range_count)]
+    return [(start, end) for start, end in zip(starts, starts[1:] + [None])]